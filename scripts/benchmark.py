@@ -0,0 +1,478 @@
+"""
+Offline benchmarks for the rendering and persistence hot paths
+
+Uses synthetic panels and stories only (no API calls). Reports latency
+percentiles and peak traced memory per benchmark, saves the results as
+JSON and compares them against a stored baseline.
+
+Usage:
+    python scripts/benchmark.py --output benchmarks/current.json
+    python scripts/benchmark.py --baseline benchmarks/baseline.json --threshold 0.2
+    python scripts/benchmark.py --filter compose --iterations 3
+"""
+import sys
+import os
+import io
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import PIL
+from PIL import Image
+
+from src.core.database import Database
+from src.services.fonts import FontRegistry
+from src.services.image_composer import ImageComposer
+from src.services.image_encoder import ImageEncoder
+from src.services.story_generator import StoryGenerator
+from src.services.story_stream import PanelStreamParser
+from src.services.text_layout import TextLayout
+
+BENCHMARKS: Dict[str, Dict] = {}
+
+
+def benchmark(name: str, iterations: int = 10, ops: int = 1):
+    """
+    Register a benchmark
+
+    The decorated function gets the shared context dict and returns the
+    callable to time (setup work done in the function body is not timed).
+
+    Args:
+        name: Benchmark name
+        iterations: Default number of timed runs
+        ops: Operations per run (for throughput)
+    """
+    def decorator(factory: Callable[[Dict], Callable[[], None]]):
+        BENCHMARKS[name] = {"factory": factory, "iterations": iterations, "ops": ops}
+        return factory
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+
+def make_panel(seed: int, size: int = 1024) -> bytes:
+    """Panel-like PNG: a tinted gradient with noise"""
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    noise = Image.effect_noise((size, size), 40).convert("RGB")
+    img = Image.blend(img, noise, 0.3)
+    tint = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    img = Image.blend(img, tint, 0.4)
+
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_story(num_panels: int = 4, seed: int = 0) -> Dict:
+    rng = random.Random(seed)
+    words = ["오늘도", "회의가", "또", "길어졌다", "커피", "한 잔만", "더", "마감이",
+             "코앞인데", "버그가", "나왔다", "괜찮아", "잘 될 거야"]
+    return {
+        "title": "직장인의 하루 " + str(seed),
+        "panels": [
+            {
+                "panel_number": i + 1,
+                "scene_description": "사무실 풍경",
+                "dialogue": " ".join(rng.choice(words) for _ in range(rng.randint(3, 12))),
+                "emotion": rng.choice(["행복", "놀람", "슬픔", "중립"]),
+                "visual_prompt": f"office worker scene {seed}-{i}, webtoon style"
+            }
+            for i in range(num_panels)
+        ]
+    }
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+
+def _compose_benchmark(width: int, height: int):
+    def factory(ctx: Dict) -> Callable[[], None]:
+        # No panel-layer cache: measure the full composition every run
+        composer = ImageComposer(width=width, height=height, max_cached_bases=0)
+        output = str(Path(ctx["tmp"]) / f"compose_{width}x{height}.png")
+        return lambda: composer.create_layout(ctx["panel_paths"], ctx["story"], output)
+    return factory
+
+
+for _w, _h in [(1080, 1920), (1080, 1350), (720, 1280)]:
+    benchmark(f"compose_{_w}x{_h}", iterations=5)(_compose_benchmark(_w, _h))
+
+
+@benchmark("compose_variants_x10", iterations=5)
+def bench_variants(ctx: Dict):
+    composer = ImageComposer()
+    variants = [{"title": f"변형 제목 {k}"} for k in range(10)]
+    composer.render_base(ctx["panel_bytes"])
+    return lambda: composer.render_variants(ctx["panel_bytes"], ctx["story"], variants)
+
+
+@benchmark("fonts_cold", iterations=20)
+def bench_fonts_cold(ctx: Dict):
+    def run():
+        registry = FontRegistry()
+        for size in (35, 50, 80):
+            registry.get(size)
+    return run
+
+
+@benchmark("fonts_warm", iterations=20, ops=1000)
+def bench_fonts_warm(ctx: Dict):
+    registry = FontRegistry()
+    registry.get(35)
+    return lambda: [registry.get(35) for _ in range(1000)]
+
+
+@benchmark("text_fit", iterations=20, ops=100)
+def bench_text_fit(ctx: Dict):
+    layout = TextLayout()
+    dialogues = [make_story(4, seed)["panels"][0]["dialogue"] for seed in range(100)]
+
+    def run():
+        # Fresh memo each run so wrapping itself is measured
+        layout._layouts.clear()
+        for text in dialogues:
+            layout.fit(text, max_width=400, max_height=300, max_size=35)
+    return run
+
+
+def _encode_benchmark(fmt: str, max_bytes: Optional[int] = None):
+    def factory(ctx: Dict) -> Callable[[], None]:
+        encoder = ImageEncoder(fmt, max_bytes=max_bytes)
+        return lambda: encoder.encode(ctx["canvas"])
+    return factory
+
+
+benchmark("encode_png", iterations=3)(_encode_benchmark("png"))
+benchmark("encode_jpeg", iterations=10)(_encode_benchmark("jpeg"))
+benchmark("encode_webp", iterations=5)(_encode_benchmark("webp"))
+benchmark("encode_jpeg_400kb", iterations=5)(_encode_benchmark("jpeg", 400 * 1024))
+
+
+@benchmark("db_insert_story", iterations=10, ops=50)
+def bench_db_insert(ctx: Dict):
+    db = Database(str(Path(ctx["tmp"]) / "bench_insert.db"))
+    panels_json = json.dumps(ctx["story"]["panels"], ensure_ascii=False)
+
+    def run():
+        for i in range(50):
+            db.insert_story(ctx["story"]["title"], "주제", "유머", panels_json)
+    return run
+
+
+@benchmark("db_update_metrics", iterations=10, ops=50)
+def bench_db_update(ctx: Dict):
+    db = Database(str(Path(ctx["tmp"]) / "bench_update.db"))
+    story_id = db.insert_story("t", "주제", "유머", "[]")
+    webtoon_id = db.insert_webtoon(story_id, "webtoon.png")
+    post_ids = [db.insert_instagram_post(webtoon_id, f"ig_{i}", "caption", "#tag")
+                for i in range(50)]
+    rng = random.Random(0)
+
+    def run():
+        for post_id in post_ids:
+            db.update_post_metrics(post_id, rng.randint(0, 1000), rng.randint(0, 100),
+                                   rng.randint(0, 50), rng.randint(0, 10000))
+    return run
+
+
+@benchmark("db_update_metrics_bulk", iterations=10, ops=1000)
+def bench_db_update_bulk(ctx: Dict):
+    db = Database(str(Path(ctx["tmp"]) / "bench_update_bulk.db"))
+    story_id = db.insert_story("t", "주제", "유머", "[]")
+    webtoon_id = db.insert_webtoon(story_id, "webtoon.png")
+    post_ids = db.insert_instagram_posts_bulk(
+        {"webtoon_id": webtoon_id, "instagram_id": f"ig_{i}", "caption": "caption", "hashtags": "#tag"}
+        for i in range(1000)
+    )["ids"]
+    rng = random.Random(0)
+
+    def run():
+        db.update_post_metrics_bulk(
+            {"post_id": post_id, "likes": rng.randint(0, 1000), "comments": rng.randint(0, 100),
+             "saves": rng.randint(0, 50), "reach": rng.randint(0, 10000)}
+            for post_id in post_ids
+        )
+    return run
+
+
+@benchmark("db_analytics_queries", iterations=20, ops=3)
+def bench_db_analytics(ctx: Dict):
+    db = Database(str(Path(ctx["tmp"]) / "bench_analytics.db"))
+    rng = random.Random(0)
+    webtoon_ids = [db.insert_webtoon(db.insert_story("t", topic, style, "[]"), "webtoon.png")
+                   for topic in ("직장", "연애", "학교") for style in ("유머", "감성")]
+    post_ids = db.insert_instagram_posts_bulk(
+        {"webtoon_id": rng.choice(webtoon_ids), "instagram_id": f"ig_{i}",
+         "posted_at": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d} 12:00:00"}
+        for i in range(5000)
+    )["ids"]
+    db.update_post_metrics_bulk(
+        {"post_id": post_id, "likes": rng.randint(0, 1000), "comments": rng.randint(0, 100),
+         "saves": rng.randint(0, 50), "reach": rng.randint(0, 10000)}
+        for post_id in post_ids
+    )
+    db.insert_ab_tests_bulk({"test_name": "caption", "variant": rng.choice("AB"),
+                             "post_id": post_id, "engagement_rate": rng.random()}
+                            for post_id in post_ids[:1000])
+
+    def run():
+        db.get_engagement_summary("topic_style")
+        db.get_top_posts(since="2026-06-01", until="2026-07-01")
+        db.get_ab_test_results("caption")
+    return run
+
+
+@benchmark("db_metrics_history_range", iterations=20, ops=100)
+def bench_db_history(ctx: Dict):
+    db = Database(str(Path(ctx["tmp"]) / "bench_history.db"))
+    story_id = db.insert_story("t", "주제", "유머", "[]")
+    webtoon_id = db.insert_webtoon(story_id, "webtoon.png")
+    post_ids = db.insert_instagram_posts_bulk(
+        {"webtoon_id": webtoon_id, "instagram_id": f"ig_{i}"} for i in range(100)
+    )["ids"]
+    # Ten days of hourly snapshots
+    now = 1_800_000_000
+    for ts in range(now - 10 * 86400, now, 3600):
+        db.update_post_metrics_bulk({"post_id": post_id, "likes": ts % 1000, "comments": 0,
+                                     "saves": 0, "reach": 0, "ts": ts}
+                                    for post_id in post_ids)
+
+    def run():
+        for post_id in post_ids:
+            db.get_metrics_history(post_id, since=now - 3 * 86400)
+    return run
+
+
+@benchmark("story_parse", iterations=20, ops=100)
+def bench_story_parse(ctx: Dict):
+    responses = ["```json\n" + json.dumps(make_story(4, seed), ensure_ascii=False) + "\n```"
+                 for seed in range(100)]
+    return lambda: [StoryGenerator.parse_story(text, 4) for text in responses]
+
+
+@benchmark("story_stream_parse", iterations=20, ops=100)
+def bench_story_stream(ctx: Dict):
+    responses = [json.dumps(make_story(4, seed), ensure_ascii=False) for seed in range(100)]
+
+    def run():
+        for text in responses:
+            parser = PanelStreamParser()
+            # Roughly the chunk size of a streamed response
+            for i in range(0, len(text), 16):
+                parser.feed(text[i:i + 16])
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Runner
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Linear-interpolated percentile of pre-sorted values"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def run_benchmark(name: str, spec: Dict, ctx: Dict, iterations: Optional[int] = None) -> Dict:
+    """
+    Time one benchmark
+
+    A warm-up run is followed by the timed runs; peak memory is measured
+    in one extra run under tracemalloc so tracing does not skew timings.
+    """
+    iterations = iterations or spec["iterations"]
+    run = spec["factory"](ctx)
+
+    run()  # warm-up (imports, caches, first-touch allocations)
+
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    ms = [t * 1000 for t in timings]
+    mean = sum(ms) / len(ms)
+    return {
+        "iterations": iterations,
+        "ops_per_iteration": spec["ops"],
+        "mean_ms": round(mean, 3),
+        "min_ms": round(ms[0], 3),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(ms[-1], 3),
+        "ops_per_sec": round(spec["ops"] / (mean / 1000), 1) if mean > 0 else None,
+        "peak_memory_kb": round(peak / 1024, 1)
+    }
+
+
+def build_context(tmp: str) -> Dict:
+    """Synthetic inputs shared by all benchmarks"""
+    panel_bytes = [make_panel(seed) for seed in range(4)]
+    panel_paths = []
+    for i, data in enumerate(panel_bytes):
+        path = Path(tmp) / f"panel_{i+1}.png"
+        path.write_bytes(data)
+        panel_paths.append(str(path))
+
+    story = make_story(4)
+
+    canvas = ImageComposer(max_cached_bases=0).render(panel_paths, story)
+
+    return {
+        "tmp": tmp,
+        "panel_bytes": panel_bytes,
+        "panel_paths": panel_paths,
+        "story": story,
+        "canvas": canvas
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """
+    Compare p50 latency and peak memory against a baseline
+
+    Returns:
+        One row per benchmark present in both, with "regressed" set when
+        either metric grew by more than threshold (e.g. 0.2 = 20%)
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        row = {"name": name, "regressed": False}
+        for metric in ("p50_ms", "peak_memory_kb"):
+            before, after = base.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            row[metric] = (before, after, change)
+            if change > threshold:
+                row["regressed"] = True
+        rows.append(row)
+    return rows
+
+
+def print_results(results: Dict):
+    print(f"\n{'benchmark':<24}{'p50':>10}{'p90':>10}{'p99':>10}{'ops/s':>12}{'peak KB':>12}")
+    print("-" * 78)
+    for name, r in results.items():
+        ops = f"{r['ops_per_sec']:,.0f}" if r["ops_per_sec"] else "-"
+        print(f"{name:<24}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{ops:>12}{r['peak_memory_kb']:>12,.0f}")
+
+
+def print_comparison(rows: List[Dict], threshold: float):
+    print(f"\n📊 기준선 비교 (허용 증가율 {threshold:.0%})")
+    print("-" * 78)
+    for row in rows:
+        parts = []
+        for metric, label in (("p50_ms", "p50"), ("peak_memory_kb", "mem")):
+            if metric in row:
+                before, after, change = row[metric]
+                parts.append(f"{label} {before:,.2f} → {after:,.2f} ({change:+.1%})")
+        mark = "❌" if row["regressed"] else "✅"
+        print(f"{mark} {row['name']:<24}" + "   ".join(parts))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="렌더링/DB 성능 벤치마크")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 기준 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="회귀로 판단할 증가율 (기본 0.2 = 20%%)")
+    parser.add_argument("--filter", help="이름에 이 문자열이 포함된 벤치마크만 실행")
+    parser.add_argument("--iterations", type=int, default=None,
+                        help="반복 횟수 (기본: 벤치마크별 설정)")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if not args.filter or args.filter in name]
+    if not names:
+        print(f"❌ '{args.filter}'에 해당하는 벤치마크가 없습니다")
+        return 1
+
+    print("=" * 78)
+    print(f"⏱️ 벤치마크 {len(names)}개 실행")
+    print("=" * 78)
+
+    tmp = tempfile.mkdtemp(prefix="webtoon_bench_")
+    results = {}
+    stdout = sys.stdout
+    try:
+        ctx = build_context(tmp)
+        for name in names:
+            print(f"  ▶ {name} ...", flush=True)
+            # Service logging would dominate the timings
+            sys.stdout = io.StringIO()
+            try:
+                results[name] = run_benchmark(name, BENCHMARKS[name], ctx, args.iterations)
+            finally:
+                sys.stdout = stdout
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print_results(results)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "results": results
+    }
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        rows = compare(results, baseline, args.threshold)
+        print_comparison(rows, args.threshold)
+        regressions = [row["name"] for row in rows if row["regressed"]]
+        if regressions:
+            print(f"\n❌ 성능 회귀: {', '.join(regressions)}")
+            return 1
+        print("\n✅ 성능 회귀 없음")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Inspect or apply database schema migrations
+
+Usage:
+    python scripts/migrate.py status [--db data/database.db]
+    python scripts/migrate.py migrate [--db data/database.db] [--to VERSION]
+"""
+import sys
+import os
+import sqlite3
+import argparse
+from pathlib import Path
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.core.config import Config
+from src.core import migrations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 스키마 마이그레이션")
+    parser.add_argument("command", choices=("status", "migrate"), help="상태 확인 또는 마이그레이션")
+    parser.add_argument("--db", default=Config.DATABASE_PATH, help="데이터베이스 경로")
+    parser.add_argument("--to", type=int, default=None, metavar="VERSION",
+                        help="이 버전까지만 적용 (기본: 최신)")
+    args = parser.parse_args()
+
+    if args.command == "status" and not os.path.exists(args.db):
+        print(f"❌ 데이터베이스 없음: {args.db}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(args.db, timeout=10)
+    try:
+        if args.command == "status":
+            steps = migrations.pending(conn, args.to)
+            print(f"📋 스키마 버전: {migrations.get_version(conn)} (최신: {migrations.latest_version()})")
+            for version, description in steps:
+                print(f"   대기 중 v{version}: {description}")
+            if not steps:
+                print("✅ 적용할 마이그레이션 없음")
+        else:
+            result = migrations.migrate(conn, args.to)
+            print(f"✅ 스키마 버전 {result['from']} → {result['to']} "
+                  f"({len(result['applied'])}개 적용)")
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
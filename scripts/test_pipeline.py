@@ -48,7 +48,7 @@ def test_image_generation():
         
         generator = ImageGenerator(
             provider=Config.IMAGE_GENERATOR,
-            api_token=Config.REPLICATE_API_TOKEN
+            api_token=Config.image_api_token()
         )
         
         test_prompt = "A cute cartoon character, office worker, simple background, webtoon style"
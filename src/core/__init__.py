@@ -1,5 +1,6 @@
 """Core module initialization"""
 from .config import Config
 from .database import Database
+from .pipeline import Stage, StagedPipeline
 
-__all__ = ["Config", "Database"]
+__all__ = ["Config", "Database", "Stage", "StagedPipeline"]
@@ -26,12 +26,75 @@ class Config:
     IMAGE_GENERATOR = os.getenv("IMAGE_GENERATOR", "replicate")
     IMAGE_WIDTH = int(os.getenv("IMAGE_WIDTH", 1080))
     IMAGE_HEIGHT = int(os.getenv("IMAGE_HEIGHT", 1920))
+    PANEL_FIT_MODE = os.getenv("PANEL_FIT_MODE", "crop")  # crop, fit or stretch
+    
+    # Keep a copy of every panel image in IMAGES_DIR (written in the background;
+    # needed for --resume and --recompose to reuse panels)
+    PANEL_ARCHIVE = os.getenv("PANEL_ARCHIVE", "true").lower() == "true"
+    
+    # Layout: grid_2x2, vertical_1x4, three_panel, strip, or auto (by panel count)
+    NUM_PANELS = int(os.getenv("NUM_PANELS", 4))
+    LAYOUT = os.getenv("LAYOUT", "auto")
+    
+    # Webtoon output: png, jpeg (progressive) or webp; OUTPUT_MAX_KB > 0
+    # lowers the quality of lossy formats until the file fits
+    OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "png")
+    OUTPUT_QUALITY = int(os.getenv("OUTPUT_QUALITY", 90))
+    OUTPUT_MAX_KB = int(os.getenv("OUTPUT_MAX_KB", 0))
+    # Extra renditions saved next to the webtoon (see ImageComposer.RENDITIONS),
+    # e.g. "feed,square,thumb"
+    RENDITIONS = [name.strip() for name in os.getenv("RENDITIONS", "").split(",")
+                  if name.strip()]
+    
+    # Vertical scroll strip instead of a fixed-size layout, rendered in tiles;
+    # STRIP_SLICE_HEIGHT > 0 splits it into files of at most that height
+    STRIP_MODE = os.getenv("STRIP_MODE", "false").lower() == "true"
+    STRIP_WIDTH = int(os.getenv("STRIP_WIDTH", 800))
+    STRIP_TILE_HEIGHT = int(os.getenv("STRIP_TILE_HEIGHT", 1024))
+    STRIP_SLICE_HEIGHT = int(os.getenv("STRIP_SLICE_HEIGHT", 0))
+    
+    # Concurrency (max in-flight generation requests per provider)
+    PROVIDER_MAX_CONCURRENCY = {
+        "replicate": int(os.getenv("REPLICATE_MAX_CONCURRENCY", 4)),
+        "fal": int(os.getenv("FAL_MAX_CONCURRENCY", 4)),
+    }
+    
+    # Image cache (content-addressed, LRU-evicted above the size budget)
+    IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "true").lower() == "true"
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "data/cache/images")
+    IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", 1024))
+    
+    # Story response cache (stored in the SQLite database). Off by default:
+    # scheduled runs repeat the same topic/style and must get a new story;
+    # enable it for debugging or reruns
+    STORY_CACHE_ENABLED = os.getenv("STORY_CACHE_ENABLED", "false").lower() == "true"
+    STORY_CACHE_TTL_HOURS = float(os.getenv("STORY_CACHE_TTL_HOURS", 168))
+    
+    # Stream the story and start panel images before it is complete
+    STORY_STREAMING = os.getenv("STORY_STREAMING", "false").lower() == "true"
+    
+    # Batch pipeline: worker threads per stage and queue size between stages
+    STAGE_WORKERS = {
+        "story": int(os.getenv("STORY_WORKERS", 2)),
+        "panels": int(os.getenv("PANEL_WORKERS", 2)),
+        "compose": int(os.getenv("COMPOSE_WORKERS", 1)),
+        "persist": 1,
+        "publish": 1,
+    }
+    STAGE_QUEUE_SIZE = int(os.getenv("STAGE_QUEUE_SIZE", 2))
     
     # Paths
     STORIES_DIR = "data/stories"
     IMAGES_DIR = "data/images"
     WEBTOONS_DIR = "data/webtoons"
     
+    @classmethod
+    def image_api_token(cls):
+        """API token for the configured image provider"""
+        if cls.IMAGE_GENERATOR == "fal":
+            return cls.FAL_KEY
+        return cls.REPLICATE_API_TOKEN
+    
     @classmethod
     def validate(cls):
         """Validate required configuration"""
@@ -2,90 +2,170 @@
 Database management
 """
 import sqlite3
+import json
+import time
+import atexit
+import threading
+import weakref
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from contextlib import contextmanager
 
+from . import migrations
+
+# Databases still alive; their WAL is folded back into the database file
+# at exit (the file is committed by the daily workflow)
+_open_databases: "weakref.WeakSet[Database]" = weakref.WeakSet()
+
+
+def _close_open_databases():
+    for db in list(_open_databases):
+        db.close()
+
+
+atexit.register(_close_open_databases)
+
+
 class Database:
-    """SQLite database manager"""
+    """
+    SQLite database manager
+    
+    Each thread keeps one long-lived connection, tuned for a write-heavy
+    pipeline: WAL journaling (readers never block the writer), synchronous
+    NORMAL (fsync at checkpoints instead of every commit; a crash can lose
+    the last commits but never corrupts the file), a larger page cache,
+    memory-mapped reads and a busy timeout so concurrent workers wait for
+    the write lock instead of failing with "database is locked".
+    
+    Every method commits on its own unless it runs inside transaction(),
+    which groups several writes into one commit.
+    """
+    
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -32000,       # KiB (negative) -> 32 MB page cache
+        "mmap_size": 268435456,     # 256 MB
+        "busy_timeout": 10000,      # ms
+        "temp_store": "MEMORY",
+    }
     
     def __init__(self, db_path: str):
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
         self._ensure_db_exists()
+        _open_databases.add(self)
     
     def _ensure_db_exists(self):
-        """Create database and tables if they don't exist"""
+        """Create the database and apply pending schema migrations"""
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Stories table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS stories (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    topic TEXT NOT NULL,
-                    style TEXT NOT NULL,
-                    panels_json TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Webtoons table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS webtoons (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    story_id INTEGER NOT NULL,
-                    image_path TEXT NOT NULL,
-                    status TEXT DEFAULT 'generated',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (story_id) REFERENCES stories(id)
-                )
-            """)
-            
-            # Instagram posts table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS instagram_posts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    webtoon_id INTEGER NOT NULL,
-                    instagram_id TEXT,
-                    caption TEXT,
-                    hashtags TEXT,
-                    posted_at TIMESTAMP,
-                    likes INTEGER DEFAULT 0,
-                    comments INTEGER DEFAULT 0,
-                    saves INTEGER DEFAULT 0,
-                    reach INTEGER DEFAULT 0,
-                    last_updated TIMESTAMP,
-                    FOREIGN KEY (webtoon_id) REFERENCES webtoons(id)
-                )
-            """)
-            
-            # A/B tests table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS ab_tests (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    test_name TEXT NOT NULL,
-                    variant TEXT NOT NULL,
-                    post_id INTEGER NOT NULL,
-                    engagement_rate REAL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (post_id) REFERENCES instagram_posts(id)
-                )
-            """)
-            
-            conn.commit()
+        # Fast path: a current schema costs one pragma read
+        conn = self._thread_connection()
+        if migrations.get_version(conn) != migrations.latest_version():
+            migrations.migrate(conn)
+    
+    def rebuild_engagement_summary(self):
+        """Recompute the engagement summary from scratch (after manual edits to posts)"""
+        with self.transaction() as conn:
+            migrations.rebuild_engagement_summary(conn.cursor())
     
     @contextmanager
     def get_connection(self):
-        """Get database connection context manager"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """
+        Get this thread's connection
+        
+        Commits when the block ends (rolls back on error), unless the block
+        runs inside transaction(), which commits once at its end.
+        """
+        conn = self._thread_connection()
+        if self._in_transaction():
+            yield conn
+            return
+        
         try:
             yield conn
-        finally:
-            conn.close()
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Group several writes into one transaction
+        
+        Takes the write lock up front (BEGIN IMMEDIATE), so a transaction
+        never fails halfway with "database is locked". Nested blocks join
+        the outermost transaction.
+        
+        Usage:
+            with db.transaction():
+                story_id = db.insert_story(...)
+                db.insert_webtoon(story_id, path)
+        """
+        conn = self._thread_connection()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+        
+        self._local.depth = depth + 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                conn.rollback()
+            raise
+        
+        self._local.depth = depth
+        if depth == 0:
+            conn.commit()
+    
+    def close(self):
+        """Checkpoint the WAL into the database file and close every connection"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        
+        for i, (_, conn) in enumerate(connections):
+            try:
+                if i == len(connections) - 1:
+                    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                conn.close()
+            except sqlite3.Error as e:
+                print(f"⚠️ DB 연결 종료 실패: {e}")
+        self._local = threading.local()
+    
+    def _in_transaction(self) -> bool:
+        return getattr(self._local, "depth", 0) > 0
+    
+    def _thread_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        
+        # Closed by close() from the main thread at exit
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               timeout=self.PRAGMAS["busy_timeout"] / 1000)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.PRAGMAS.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        self._local.conn = conn
+        
+        with self._connections_lock:
+            # Close connections left behind by finished threads
+            alive = []
+            for thread, other in self._connections:
+                if thread.is_alive():
+                    alive.append((thread, other))
+                else:
+                    other.close()
+            alive.append((threading.current_thread(), conn))
+            self._connections = alive
+        
+        return conn
     
     def insert_story(self, title: str, topic: str, style: str, panels_json: str) -> int:
         """Insert a new story"""
@@ -95,7 +175,6 @@ class Database:
                 "INSERT INTO stories (title, topic, style, panels_json) VALUES (?, ?, ?, ?)",
                 (title, topic, style, panels_json)
             )
-            conn.commit()
             return cursor.lastrowid
     
     def insert_webtoon(self, story_id: int, image_path: str) -> int:
@@ -106,9 +185,17 @@ class Database:
                 "INSERT INTO webtoons (story_id, image_path) VALUES (?, ?)",
                 (story_id, image_path)
             )
-            conn.commit()
             return cursor.lastrowid
     
+    def update_webtoon_path(self, webtoon_id: int, image_path: str):
+        """Point a webtoon at a re-rendered image (its extension may have changed)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE webtoons SET image_path = ? WHERE id = ?",
+                (image_path, webtoon_id)
+            )
+    
     def insert_instagram_post(self, webtoon_id: int, instagram_id: str, 
                              caption: str, hashtags: str) -> int:
         """Insert a new Instagram post"""
@@ -120,19 +207,483 @@ class Database:
                    VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)""",
                 (webtoon_id, instagram_id, caption, hashtags)
             )
-            conn.commit()
             return cursor.lastrowid
     
+    # Appends a metrics snapshot of the post matched by {key}; a second
+    # snapshot in the same second replaces the first
+    _SNAPSHOT_SQL = """INSERT OR REPLACE INTO post_metrics_history 
+                       (post_id, ts, likes, comments, saves, reach) 
+                       SELECT id, ?, ?, ?, ?, ? FROM instagram_posts WHERE {key} = ?"""
+    
+    # Sets the current metrics of the post matched by {key}, unless the
+    # history already holds a newer snapshot (a backfilled older ts only
+    # lands in the history). Run after the snapshots are appended.
+    _CURRENT_SQL = """UPDATE instagram_posts 
+                      SET likes = ?, comments = ?, saves = ?, reach = ?, 
+                          last_updated = CURRENT_TIMESTAMP
+                      WHERE {key} = ? AND NOT EXISTS (
+                          SELECT 1 FROM post_metrics_history AS h 
+                          WHERE h.post_id = instagram_posts.id AND h.ts > ?
+                      )"""
+    
     def update_post_metrics(self, post_id: int, likes: int, comments: int, 
-                           saves: int, reach: int):
-        """Update Instagram post metrics"""
+                           saves: int, reach: int, ts: Optional[int] = None):
+        """
+        Append a metrics snapshot and update the post's current metrics
+        
+        The post's metrics are only overwritten when ts is its newest snapshot.
+        """
+        ts = int(time.time()) if ts is None else int(ts)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._SNAPSHOT_SQL.format(key="id"),
+                           (ts, likes, comments, saves, reach, post_id))
+            cursor.execute(self._CURRENT_SQL.format(key="id"),
+                           (likes, comments, saves, reach, post_id, ts))
+    
+    def insert_instagram_posts_bulk(self, posts: Iterable[Dict]) -> Dict:
+        """
+        Insert many Instagram posts in one transaction
+        
+        Args:
+            posts: Dicts with webtoon_id, instagram_id, caption, hashtags
+                and optionally posted_at (default: now)
+        
+        Returns:
+            {"rows", "ids" (in input order), "elapsed" (seconds)}
+        """
+        start = time.perf_counter()
+        ids = []
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            for post in posts:
+                cursor.execute(
+                    """INSERT INTO instagram_posts 
+                       (webtoon_id, instagram_id, caption, hashtags, posted_at) 
+                       VALUES (?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+                    (post["webtoon_id"], post.get("instagram_id"), post.get("caption"),
+                     post.get("hashtags"), post.get("posted_at"))
+                )
+                ids.append(cursor.lastrowid)
+        
+        return {"rows": len(ids), "ids": ids, "elapsed": time.perf_counter() - start}
+    
+    # Metrics every update_post_metrics_bulk entry must carry
+    METRIC_FIELDS = ("likes", "comments", "saves", "reach")
+    
+    def update_post_metrics_bulk(self, metrics: Iterable[Dict]) -> Dict:
+        """
+        Update metrics of many posts in one transaction
+        
+        Every entry is appended to the metrics history; a post's current
+        metrics are only overwritten by its newest snapshot, so backfilling
+        older ts values never rolls them back. An entry missing a metric or
+        a post key raises ValueError before anything is written.
+        
+        Args:
+            metrics: Dicts with likes, comments, saves, reach and either
+                post_id or instagram_id (the media ID the API returns);
+                optionally ts (unix epoch of the snapshot, default: now)
+        
+        Returns:
+            {"rows" (posts whose current metrics changed), "snapshots"
+            (history rows written), "elapsed" (seconds)}
+        """
+        now = int(time.time())
+        by_id, by_media_id = [], []
+        for m in metrics:
+            # A missing metric must not overwrite the stored value with 0
+            missing = [name for name in self.METRIC_FIELDS if m.get(name) is None]
+            if missing:
+                raise ValueError(f"Missing metrics {', '.join(missing)} in {m!r}")
+            if m.get("post_id") is None and m.get("instagram_id") is None:
+                raise ValueError(f"Metrics need post_id or instagram_id: {m!r}")
+            
+            values = tuple(m[name] for name in self.METRIC_FIELDS)
+            ts = now if m.get("ts") is None else int(m["ts"])
+            if m.get("post_id") is not None:
+                by_id.append((ts, values, m["post_id"]))
+            else:
+                by_media_id.append((ts, values, m["instagram_id"]))
+        
+        start = time.perf_counter()
+        rows = snapshots = 0
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            batches = [(key, updates) for key, updates in
+                       (("id", by_id), ("instagram_id", by_media_id)) if updates]
+            # Snapshots first: the updates then only apply each post's newest one
+            for key, updates in batches:
+                cursor.executemany(
+                    self._SNAPSHOT_SQL.format(key=key),
+                    [(ts, *values, post_key) for ts, values, post_key in updates]
+                )
+                snapshots += cursor.rowcount
+            for key, updates in batches:
+                cursor.executemany(
+                    self._CURRENT_SQL.format(key=key),
+                    [(*values, post_key, ts) for ts, values, post_key in updates]
+                )
+                rows += cursor.rowcount
+        
+        return {"rows": rows, "snapshots": snapshots, "elapsed": time.perf_counter() - start}
+    
+    def insert_ab_tests_bulk(self, results: Iterable[Dict]) -> Dict:
+        """
+        Insert many A/B test results in one transaction
+        
+        Args:
+            results: Dicts with test_name, variant, post_id and engagement_rate
+        
+        Returns:
+            {"rows", "elapsed" (seconds)}
+        """
+        params = [(r["test_name"], r["variant"], r["post_id"], r.get("engagement_rate"))
+                  for r in results]
+        
+        start = time.perf_counter()
+        with self.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO ab_tests (test_name, variant, post_id, engagement_rate) 
+                   VALUES (?, ?, ?, ?)""",
+                params
+            )
+        
+        return {"rows": len(params), "elapsed": time.perf_counter() - start}
+    
+    def get_cached_story(self, cache_key: str, max_age: float) -> Optional[str]:
+        """
+        Get a cached story response
+        
+        Args:
+            cache_key: Story cache key
+            max_age: Maximum entry age in seconds
+        
+        Returns:
+            Story JSON, or None if missing or expired
+        """
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(
-                """UPDATE instagram_posts 
-                   SET likes = ?, comments = ?, saves = ?, reach = ?, 
-                       last_updated = CURRENT_TIMESTAMP
-                   WHERE id = ?""",
-                (likes, comments, saves, reach, post_id)
+                "SELECT story_json FROM story_cache WHERE cache_key = ? AND created_at >= ?",
+                (cache_key, time.time() - max_age)
             )
-            conn.commit()
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            
+            cursor.execute(
+                "UPDATE story_cache SET hits = hits + 1 WHERE cache_key = ?",
+                (cache_key,)
+            )
+            return row["story_json"]
+    
+    def put_cached_story(self, cache_key: str, model: str, topic: str, style: str,
+                         num_panels: int, story_json: str):
+        """Insert or replace a cached story response"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT OR REPLACE INTO story_cache 
+                   (cache_key, model, topic, style, num_panels, story_json, created_at) 
+                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (cache_key, model, topic, style, num_panels, story_json, time.time())
+            )
+    
+    # Columns save_run_checkpoint may set
+    RUN_FIELDS = ("stage", "status", "story_id", "webtoon_path", "webtoon_id", "error")
+    
+    def create_run(self, run_id: str, topic: str, style: str, post: bool):
+        """Register a pipeline run (no-op if it already exists)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """INSERT OR IGNORE INTO pipeline_runs (run_id, topic, style, post) 
+                   VALUES (?, ?, ?, ?)""",
+                (run_id, topic, style, int(post))
+            )
+    
+    def save_run_checkpoint(self, run_id: str, **fields):
+        """
+        Update a pipeline run's checkpoint
+        
+        Args:
+            run_id: Run ID
+            **fields: Any of RUN_FIELDS
+        """
+        unknown = set(fields) - set(self.RUN_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown run fields: {', '.join(sorted(unknown))}")
+        if not fields:
+            return
+        
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"""UPDATE pipeline_runs SET {assignments}, updated_at = CURRENT_TIMESTAMP 
+                    WHERE run_id = ?""",
+                (*fields.values(), run_id)
+            )
+    
+    def save_panel_checkpoint(self, run_id: str, index: int, image_path: str):
+        """Record one finished panel image (safe to call from parallel workers)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """UPDATE pipeline_runs 
+                   SET panel_paths_json = json_set(COALESCE(panel_paths_json, '{}'), ?, ?), 
+                       updated_at = CURRENT_TIMESTAMP 
+                   WHERE run_id = ?""",
+                (f'$."{int(index)}"', image_path, run_id)
+            )
+    
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        """
+        Get a pipeline run checkpoint
+        
+        Returns:
+            Dict of the run's columns with panel_paths as {index: path},
+            or None if the run is unknown
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM pipeline_runs WHERE run_id = ?", (run_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            
+            run = dict(row)
+            run["panel_paths"] = {
+                int(index): path
+                for index, path in json.loads(run.pop("panel_paths_json") or "{}").items()
+            }
+            return run
+    
+    def get_story(self, story_id: int) -> Optional[Dict]:
+        """Get a stored story as {"id", "title", "topic", "style", "panels"}"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id, title, topic, style, panels_json FROM stories WHERE id = ?",
+                (story_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            
+            story = dict(row)
+            story["panels"] = json.loads(story.pop("panels_json"))
+            return story
+    
+    # Groupings get_engagement_summary accepts
+    SUMMARY_GROUPS = {
+        "topic": ("topic",),
+        "style": ("style",),
+        "topic_style": ("topic", "style"),
+    }
+    
+    def get_engagement_summary(self, group_by: str = "topic") -> List[Dict]:
+        """
+        Engagement totals by topic, style or both, best first
+        
+        Reads the trigger-maintained engagement_summary table (one row per
+        topic and style), so the cost does not grow with the post history.
+        
+        Args:
+            group_by: "topic", "style" or "topic_style"
+        
+        Returns:
+            Dicts with the group columns, posts, likes, comments, saves,
+            reach, avg_engagement (likes + comments + saves per post) and
+            engagement_rate (engagement / reach)
+        """
+        if group_by not in self.SUMMARY_GROUPS:
+            raise ValueError(f"Unknown grouping: {group_by} (expected one of {tuple(self.SUMMARY_GROUPS)})")
+        columns = ", ".join(self.SUMMARY_GROUPS[group_by])
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {columns}, SUM(posts) AS posts, SUM(likes) AS likes, 
+                       SUM(comments) AS comments, SUM(saves) AS saves, SUM(reach) AS reach 
+                FROM engagement_summary 
+                WHERE posts > 0 
+                GROUP BY {columns}
+            """)
+            rows = [dict(row) for row in cursor.fetchall()]
+        
+        for row in rows:
+            engagement = row["likes"] + row["comments"] + row["saves"]
+            row["avg_engagement"] = engagement / row["posts"]
+            row["engagement_rate"] = engagement / row["reach"] if row["reach"] else 0.0
+        rows.sort(key=lambda r: r["avg_engagement"], reverse=True)
+        return rows
+    
+    def get_top_posts(self, since: Optional[str] = None, until: Optional[str] = None,
+                      limit: int = 10) -> List[Dict]:
+        """
+        Most engaging posts in a time window
+        
+        The window is a range scan on the posted_at index.
+        
+        Args:
+            since: Earliest posted_at, "YYYY-MM-DD[ HH:MM:SS]" UTC (default: no limit)
+            until: Posted before this (default: no limit)
+            limit: Number of posts
+        
+        Returns:
+            Post dicts (id, instagram_id, webtoon_id, posted_at, metrics,
+            engagement, title, topic, style), highest engagement first
+        """
+        conditions, params = [], []
+        if since is not None:
+            conditions.append("p.posted_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("p.posted_at < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT p.id, p.instagram_id, p.webtoon_id, p.posted_at, 
+                       p.likes, p.comments, p.saves, p.reach, 
+                       p.likes + p.comments + p.saves AS engagement, 
+                       s.title, s.topic, s.style 
+                FROM instagram_posts p 
+                LEFT JOIN webtoons w ON w.id = p.webtoon_id 
+                LEFT JOIN stories s ON s.id = w.story_id 
+                {where} 
+                ORDER BY engagement DESC 
+                LIMIT ?
+            """, (*params, limit))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_ab_test_results(self, test_name: str) -> List[Dict]:
+        """
+        Per-variant results of an A/B test, best first
+        
+        Answered from the (test_name, variant, engagement_rate) index alone.
+        
+        Returns:
+            Dicts with variant, samples, avg_rate, min_rate, max_rate
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT variant, COUNT(engagement_rate) AS samples, 
+                       AVG(engagement_rate) AS avg_rate, 
+                       MIN(engagement_rate) AS min_rate, MAX(engagement_rate) AS max_rate 
+                FROM ab_tests 
+                WHERE test_name = ? 
+                GROUP BY variant 
+                ORDER BY avg_rate DESC
+            """, (test_name,))
+            return [dict(row) for row in cursor.fetchall()]
+    
+    # Downsampling tiers: snapshots older than `days` keep one per `bucket` seconds
+    HISTORY_TIERS = (
+        ("hourly", 7, 3600),
+        ("daily", 90, 86400),
+    )
+    
+    def get_metrics_history(self, post_id: int, since: Optional[int] = None,
+                            until: Optional[int] = None) -> List[Dict]:
+        """
+        Metrics snapshots of a post, oldest first
+        
+        A range scan of the (post_id, ts) primary key; the table has no
+        rowid, so no other lookups are needed.
+        
+        Args:
+            post_id: Post ID
+            since: Earliest ts, unix epoch (default: no limit)
+            until: Snapshots before this ts (default: no limit)
+        
+        Returns:
+            Dicts with ts, likes, comments, saves, reach
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT ts, likes, comments, saves, reach FROM post_metrics_history 
+                   WHERE post_id = ? AND ts >= ? AND ts < ? 
+                   ORDER BY ts""",
+                (post_id, since if since is not None else -2**63,
+                 until if until is not None else 2**63 - 1)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_latest_metrics(self, post_ids: Iterable[int],
+                           at: Optional[int] = None) -> Dict[int, Dict]:
+        """
+        Last snapshot of each post at or before a time
+        
+        Args:
+            post_ids: Post IDs
+            at: Unix epoch (default: now)
+        
+        Returns:
+            {post_id: {"ts", "likes", "comments", "saves", "reach"}}; posts
+            without a snapshot are left out
+        """
+        at = int(time.time()) if at is None else int(at)
+        latest = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for post_id in post_ids:
+                # One descending key probe per post
+                cursor.execute(
+                    """SELECT ts, likes, comments, saves, reach FROM post_metrics_history 
+                       WHERE post_id = ? AND ts <= ? 
+                       ORDER BY ts DESC LIMIT 1""",
+                    (post_id, at)
+                )
+                row = cursor.fetchone()
+                if row is not None:
+                    latest[post_id] = dict(row)
+        return latest
+    
+    def downsample_metrics_history(self, now: Optional[int] = None,
+                                   tiers: Optional[Tuple] = None) -> Dict:
+        """
+        Thin out old metrics snapshots so history stays bounded
+        
+        Snapshots are kept raw for 7 days, then one per hour, then one per
+        day after 90 days (HISTORY_TIERS). Metrics are running totals, so
+        the last snapshot of each bucket is kept as is. Tier cutoffs are
+        aligned to bucket boundaries, which makes repeated runs no-ops.
+        
+        Args:
+            now: Unix epoch the ages are measured from (default: now)
+            tiers: (name, days, bucket seconds) tuples (default: HISTORY_TIERS)
+        
+        Returns:
+            {"deleted": {tier name: rows}, "rows" (remaining), "elapsed" (seconds)}
+        """
+        now = int(time.time()) if now is None else int(now)
+        start = time.perf_counter()
+        deleted = {}
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            for name, days, bucket in tiers or self.HISTORY_TIERS:
+                cutoff = (now - days * 86400) // bucket * bucket
+                # Drop a snapshot when a later one falls in the same bucket
+                cursor.execute(
+                    """DELETE FROM post_metrics_history AS h 
+                       WHERE h.ts < :cutoff AND EXISTS (
+                           SELECT 1 FROM post_metrics_history AS later 
+                           WHERE later.post_id = h.post_id 
+                             AND later.ts > h.ts 
+                             AND later.ts < h.ts - h.ts % :bucket + :bucket
+                       )""",
+                    {"cutoff": cutoff, "bucket": bucket}
+                )
+                deleted[name] = cursor.rowcount
+            
+            cursor.execute("SELECT COUNT(*) FROM post_metrics_history")
+            rows = cursor.fetchone()[0]
+        
+        return {"deleted": deleted, "rows": rows, "elapsed": time.perf_counter() - start}
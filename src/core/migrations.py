@@ -0,0 +1,282 @@
+"""
+Schema migrations - versioned with PRAGMA user_version
+
+Database() applies pending steps on startup; scripts/migrate.py inspects
+or migrates a database from the command line.
+"""
+import sqlite3
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Migration steps: version -> (description, function(cursor))
+MIGRATIONS: Dict[int, Tuple[str, Callable[[sqlite3.Cursor], None]]] = {}
+
+# Post metrics aggregated into engagement_summary
+SUMMARY_METRICS = ("likes", "comments", "saves", "reach")
+
+
+def register_migration(version: int, description: str):
+    """
+    Decorator adding a migration step
+
+    Steps run in version order, each in its own transaction together with
+    the user_version bump, so a failed step leaves the previous version
+    intact. Never edit a released step; add a new one.
+    """
+    def decorator(func: Callable[[sqlite3.Cursor], None]):
+        if version in MIGRATIONS:
+            raise ValueError(f"Duplicate migration version: {version}")
+        MIGRATIONS[version] = (description, func)
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    """Version the code expects"""
+    return max(MIGRATIONS, default=0)
+
+
+def get_version(conn: sqlite3.Connection) -> int:
+    """Schema version of a database (0: new or created before migrations)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def pending(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Tuple[int, str]]:
+    """(version, description) of the steps migrate() would apply"""
+    current = get_version(conn)
+    target = latest_version() if target is None else target
+    return [(version, MIGRATIONS[version][0])
+            for version in sorted(MIGRATIONS) if current < version <= target]
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> Dict:
+    """
+    Bring a database up to a schema version
+
+    Args:
+        conn: Open connection (not inside a transaction)
+        target: Version to stop at (default: latest)
+
+    Returns:
+        {"from", "to", "applied": [(version, description), ...]}
+    """
+    target = latest_version() if target is None else target
+    start = get_version(conn)
+    if start > latest_version():
+        raise RuntimeError(
+            f"Database schema version {start} is newer than this code ({latest_version()})"
+        )
+
+    applied = []
+    for version in sorted(MIGRATIONS):
+        if version > target:
+            break
+
+        # The write lock makes concurrent workers apply each step once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if get_version(conn) >= version:
+                conn.rollback()
+                continue
+            description, step = MIGRATIONS[version]
+            step(conn.cursor())
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+        applied.append((version, description))
+        print(f"🗃️ DB 마이그레이션 v{version}: {description}")
+
+    return {"from": start, "to": get_version(conn), "applied": applied}
+
+
+def rebuild_engagement_summary(cursor: sqlite3.Cursor):
+    """Recompute engagement_summary from every post"""
+    cursor.execute("DELETE FROM engagement_summary")
+    cursor.execute(f"""
+        INSERT INTO engagement_summary (topic, style, posts, {", ".join(SUMMARY_METRICS)})
+        SELECT s.topic, s.style, COUNT(*),
+               {", ".join(f"COALESCE(SUM(p.{m}), 0)" for m in SUMMARY_METRICS)}
+        FROM instagram_posts p
+        JOIN webtoons w ON w.id = p.webtoon_id
+        JOIN stories s ON s.id = w.story_id
+        GROUP BY s.topic, s.style
+    """)
+
+
+# Steps use IF NOT EXISTS: databases created before migrations existed are
+# at version 0 but may already have some of these tables.
+
+@register_migration(1, "core tables")
+def _core_tables(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS stories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            style TEXT NOT NULL,
+            panels_json TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS webtoons (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL,
+            image_path TEXT NOT NULL,
+            status TEXT DEFAULT 'generated',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (story_id) REFERENCES stories(id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS instagram_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            webtoon_id INTEGER NOT NULL,
+            instagram_id TEXT,
+            caption TEXT,
+            hashtags TEXT,
+            posted_at TIMESTAMP,
+            likes INTEGER DEFAULT 0,
+            comments INTEGER DEFAULT 0,
+            saves INTEGER DEFAULT 0,
+            reach INTEGER DEFAULT 0,
+            last_updated TIMESTAMP,
+            FOREIGN KEY (webtoon_id) REFERENCES webtoons(id)
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ab_tests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            test_name TEXT NOT NULL,
+            variant TEXT NOT NULL,
+            post_id INTEGER NOT NULL,
+            engagement_rate REAL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (post_id) REFERENCES instagram_posts(id)
+        )
+    """)
+
+
+@register_migration(2, "story response cache")
+def _story_cache(cursor: sqlite3.Cursor):
+    # created_at is a unix epoch for TTL checks
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS story_cache (
+            cache_key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            style TEXT NOT NULL,
+            num_panels INTEGER NOT NULL,
+            story_json TEXT NOT NULL,
+            hits INTEGER DEFAULT 0,
+            created_at REAL NOT NULL
+        )
+    """)
+
+
+@register_migration(3, "pipeline run checkpoints")
+def _pipeline_runs(cursor: sqlite3.Cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS pipeline_runs (
+            run_id TEXT PRIMARY KEY,
+            topic TEXT NOT NULL,
+            style TEXT NOT NULL,
+            post INTEGER DEFAULT 0,
+            stage TEXT,
+            status TEXT DEFAULT 'running',
+            story_id INTEGER,
+            panel_paths_json TEXT DEFAULT '{}',
+            webtoon_path TEXT,
+            webtoon_id INTEGER,
+            error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (story_id) REFERENCES stories(id),
+            FOREIGN KEY (webtoon_id) REFERENCES webtoons(id)
+        )
+    """)
+
+
+@register_migration(4, "analytics indexes and engagement summary")
+def _analytics(cursor: sqlite3.Cursor):
+    # Secondary indexes for joins, time windows and A/B lookups
+    # (ab_tests also covers engagement_rate, so results are index-only)
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS idx_webtoons_story_id ON webtoons(story_id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_webtoon_id ON instagram_posts(webtoon_id)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_posted_at ON instagram_posts(posted_at)",
+        "CREATE INDEX IF NOT EXISTS idx_posts_instagram_id ON instagram_posts(instagram_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ab_tests_test_variant "
+        "ON ab_tests(test_name, variant, engagement_rate)",
+    ):
+        cursor.execute(statement)
+
+    # Engagement totals per (topic, style), kept current by triggers
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS engagement_summary (
+            topic TEXT NOT NULL,
+            style TEXT NOT NULL,
+            posts INTEGER NOT NULL DEFAULT 0,
+            likes INTEGER NOT NULL DEFAULT 0,
+            comments INTEGER NOT NULL DEFAULT 0,
+            saves INTEGER NOT NULL DEFAULT 0,
+            reach INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (topic, style)
+        )
+    """)
+
+    metrics = SUMMARY_METRICS
+    # Add the NEW row to / subtract the OLD row from its story's (topic, style)
+    add = f"""
+        INSERT INTO engagement_summary (topic, style, posts, {", ".join(metrics)})
+        SELECT s.topic, s.style, 1, {", ".join(f"COALESCE(NEW.{m}, 0)" for m in metrics)}
+        FROM webtoons w JOIN stories s ON s.id = w.story_id
+        WHERE w.id = NEW.webtoon_id
+        ON CONFLICT (topic, style) DO UPDATE SET posts = posts + 1,
+            {", ".join(f"{m} = {m} + excluded.{m}" for m in metrics)};
+    """
+    subtract = f"""
+        UPDATE engagement_summary SET posts = posts - 1,
+            {", ".join(f"{m} = {m} - COALESCE(OLD.{m}, 0)" for m in metrics)}
+        WHERE (topic, style) = (
+            SELECT s.topic, s.style FROM webtoons w JOIN stories s ON s.id = w.story_id
+            WHERE w.id = OLD.webtoon_id
+        );
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_summary_post_insert
+        AFTER INSERT ON instagram_posts BEGIN {add} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_summary_post_update
+        AFTER UPDATE OF webtoon_id, {", ".join(metrics)} ON instagram_posts
+        BEGIN {subtract} {add} END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_summary_post_delete
+        AFTER DELETE ON instagram_posts BEGIN {subtract} END
+    """)
+
+    rebuild_engagement_summary(cursor)
+
+
+@register_migration(5, "post metrics history")
+def _metrics_history(cursor: sqlite3.Cursor):
+    # Clustered on (post_id, ts): a post's range is one contiguous b-tree
+    # walk with no rowid lookups
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS post_metrics_history (
+            post_id INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            likes INTEGER NOT NULL DEFAULT 0,
+            comments INTEGER NOT NULL DEFAULT 0,
+            saves INTEGER NOT NULL DEFAULT 0,
+            reach INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (post_id, ts)
+        ) WITHOUT ROWID
+    """)
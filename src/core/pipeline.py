@@ -0,0 +1,153 @@
+"""
+Staged, queue-based pipeline executor
+"""
+import sys
+import queue
+import threading
+import traceback
+from typing import Callable, Dict, List, Optional
+
+# UTF-8 encoding
+try:
+    sys.stdout.reconfigure(encoding='utf-8')
+except (AttributeError, TypeError):
+    pass
+
+_STOP = object()
+
+
+class Stage:
+    """One pipeline stage: a function run by a pool of worker threads"""
+
+    def __init__(self, name: str, func: Callable[[Dict], Optional[Dict]],
+                 workers: int = 1, queue_size: int = 2):
+        """
+        Initialize stage
+
+        Args:
+            name: Stage name (used in thread names and error reports)
+            func: Called with the job dict; may update it in place or
+                return a replacement
+            workers: Number of worker threads
+            queue_size: Max jobs waiting for this stage (backpressure)
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.threads: List[threading.Thread] = []
+
+
+class StagedPipeline:
+    """
+    Run jobs through a chain of stages, each with its own queue and workers
+
+    Jobs are dicts. While job N is in stage k, job N+1 can be in stage
+    k-1, so e.g. one webtoon's story is generated while another's panels
+    render. Bounded queues block submit() and upstream workers when a
+    downstream stage falls behind. A job whose stage raises is marked
+    failed ("error", "failed_stage") and skips the remaining stages.
+
+    Usage:
+        with StagedPipeline([Stage("a", fa), Stage("b", fb, workers=2)]) as p:
+            for job in jobs:
+                p.submit(job)
+        results = p.results
+    """
+
+    def __init__(self, stages: List[Stage]):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+
+        self.stages = stages
+        self.results: List[Dict] = []
+        self._results_lock = threading.Lock()
+        self._submitted = 0
+        self._started = False
+        self._closed = False
+
+    def start(self):
+        """Start every stage's worker threads"""
+        if self._started:
+            return
+        self._started = True
+
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(index,),
+                    name=f"{stage.name}-{n+1}", daemon=True
+                )
+                thread.start()
+                stage.threads.append(thread)
+
+    def submit(self, job: Dict):
+        """Queue a job for the first stage (blocks while that queue is full)"""
+        if self._closed:
+            raise RuntimeError("Pipeline is closed")
+        self.start()
+
+        job.setdefault("seq", self._submitted)
+        self._submitted += 1
+        self.stages[0].queue.put(job)
+
+    def close(self) -> List[Dict]:
+        """
+        Wait for all submitted jobs to finish and stop the workers
+
+        Returns:
+            Finished jobs in submission order
+        """
+        if not self._closed:
+            self._closed = True
+            self.start()
+
+            # Stop stages front to back: a stage's stop markers are queued
+            # only after every job from the stage before it was handed over
+            for stage in self.stages:
+                for _ in range(stage.workers):
+                    stage.queue.put(_STOP)
+                for thread in stage.threads:
+                    thread.join()
+
+            self.results.sort(key=lambda job: job["seq"])
+
+        return self.results
+
+    def _worker(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+
+        while True:
+            job = stage.queue.get()
+            if job is _STOP:
+                return
+
+            try:
+                result = stage.func(job)
+                if result is not None:
+                    job = result
+            except Exception as e:
+                print(f"❌ [{stage.name}] 작업 실패: {e}")
+                traceback.print_exc()
+                job["error"] = str(e)
+                job["failed_stage"] = stage.name
+                self._finish(job)
+                continue
+
+            if next_stage is not None:
+                next_stage.queue.put(job)
+            else:
+                self._finish(job)
+
+    def _finish(self, job: Dict):
+        with self._results_lock:
+            self.results.append(job)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
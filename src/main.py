@@ -4,8 +4,11 @@ Main pipeline - orchestrates the entire webtoon generation and posting process
 import sys
 import os
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
 # UTF-8 encoding
 try:
@@ -15,115 +18,434 @@ except (AttributeError, TypeError):
 
 from src.core.config import Config
 from src.core.database import Database
+from src.core.pipeline import Stage, StagedPipeline
 from src.services.story_generator import StoryGenerator
 from src.services.image_generator import ImageGenerator
+from src.services.image_cache import ImageCache
 from src.services.image_composer import ImageComposer
-from src.services.instagram_poster import InstagramPoster
+from src.services.image_encoder import ImageEncoder
+from src.services.artifacts import ArtifactArchiver
 
 
-def run_pipeline(topic: str = "직장인 공감", style: str = "유머", 
-                post_to_instagram: bool = False):
+def new_run_id() -> str:
     """
-    Run the complete webtoon generation pipeline
+    Create a collision-free run ID used to name a run's artifacts
     
-    Args:
-        topic: Story topic
-        style: Story style
-        post_to_instagram: Whether to post to Instagram
+    The timestamp keeps files sortable; the random suffix keeps runs that
+    start in the same second (batch jobs) apart.
     """
-    print("="*70)
-    print("🚀 AI 웹툰 자동 생성 파이프라인 시작")
-    print("="*70)
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
+
+
+def create_story_generator(db: Database) -> StoryGenerator:
+    """Create the story generator, with the response cache if enabled"""
+    return StoryGenerator(
+        Config.ANTHROPIC_API_KEY,
+        db=db if Config.STORY_CACHE_ENABLED else None,
+        cache_ttl=Config.STORY_CACHE_TTL_HOURS * 3600
+    )
+
+
+def create_image_generator() -> ImageGenerator:
+    """Create the configured image generator"""
+    cache = None
+    if Config.IMAGE_CACHE_ENABLED:
+        cache = ImageCache(Config.IMAGE_CACHE_DIR,
+                           max_bytes=Config.IMAGE_CACHE_MAX_MB * 1024 * 1024)
     
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return ImageGenerator(
+        provider=Config.IMAGE_GENERATOR,
+        api_token=Config.image_api_token(),
+        max_concurrency=Config.PROVIDER_MAX_CONCURRENCY.get(Config.IMAGE_GENERATOR),
+        cache=cache
+    )
+
+
+def create_composer() -> ImageComposer:
+    """Create the composer with the configured layout and output encoder"""
+    encoder = ImageEncoder(
+        Config.OUTPUT_FORMAT,
+        quality=Config.OUTPUT_QUALITY,
+        max_bytes=Config.OUTPUT_MAX_KB * 1024 or None
+    )
+    return ImageComposer(width=Config.IMAGE_WIDTH, height=Config.IMAGE_HEIGHT,
+                         fit_mode=Config.PANEL_FIT_MODE, layout=Config.LAYOUT,
+                         encoder=encoder)
+
+
+def generate_panel_image(image_gen: ImageGenerator, panel: Dict, index: int,
+                         total: int, run_id: str, use_cache: bool = True,
+                         on_success: Optional[Callable[[int, str], None]] = None,
+                         archiver: Optional[ArtifactArchiver] = None) -> Optional[bytes]:
+    """
+    Generate one panel image in memory, queueing its archival to disk
+    
+    Args:
+        image_gen: Image generator
+        panel: Panel dict with visual_prompt
+        index: Zero-based panel index
+        total: Total number of panels
+        run_id: Run ID used in file names
+        use_cache: Whether to serve the panel from the image cache
+        on_success: Called with (index, path) once the image is archived
+        archiver: Writes the image to Config.IMAGES_DIR in the background
+            (None: the image is not kept on disk)
+    
+    Returns:
+        Encoded image bytes, or None if generation failed (the composer
+        draws a placeholder)
+    """
+    print(f"\n  [{index+1}/{total}] 패널 이미지 생성 중...")
     
     try:
-        # Validate config
-        Config.validate()
+        # Generate and download image (cache hits skip the API call)
+        result = image_gen.generate_bytes(
+            prompt=panel['visual_prompt'],
+            width=512,  # Smaller for faster generation
+            height=512,
+            use_cache=use_cache
+        )
+    except Exception as e:
+        print(f"  ❌ 패널 {index+1} 이미지 생성 실패: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        print(f"  ⚠️ Placeholder 사용")
+        return None
+    
+    if archiver is not None:
+        archive_panel_image(archiver, result["data"], index, run_id, on_success)
+    
+    return result["data"]
+
+
+def archive_panel_image(archiver: ArtifactArchiver, data: bytes, index: int, run_id: str,
+                        on_success: Optional[Callable[[int, str], None]] = None):
+    """Queue a panel image's write to Config.IMAGES_DIR, calling on_success(index, path) once written"""
+    image_path = Path(Config.IMAGES_DIR) / f"panel_{run_id}_{index+1}.png"
+    on_done = None
+    if on_success is not None:
+        on_done = lambda path: on_success(index, path)
+    archiver.archive(data, str(image_path), group=run_id, on_done=on_done)
+
+
+def generate_panel_images(image_gen: ImageGenerator, panels: List[Dict],
+                          run_id: str, use_cache: bool = True,
+                          indices: Optional[List[int]] = None,
+                          on_success: Optional[Callable[[int, str], None]] = None,
+                          archiver: Optional[ArtifactArchiver] = None) -> List[Optional[bytes]]:
+    """
+    Generate all panel images concurrently
+    
+    Every panel is submitted at once; the provider's in-flight limit
+    (Config.PROVIDER_MAX_CONCURRENCY) is enforced inside ImageGenerator.
+    
+    Args:
+        image_gen: Image generator
+        panels: Story panels
+        run_id: Run ID used in file names
+        use_cache: Whether to serve panels from the image cache
+        indices: Panel indices to generate (default: all)
+        on_success: Passed to generate_panel_image
+        archiver: Passed to generate_panel_image
+    
+    Returns:
+        Panel image bytes (None for failed panels), in the order of indices
+    """
+    if indices is None:
+        indices = list(range(len(panels)))
+    if not indices:
+        return []
+    
+    with ThreadPoolExecutor(max_workers=len(indices),
+                            thread_name_prefix="panel") as executor:
+        futures = [
+            executor.submit(generate_panel_image, image_gen, panels[i], i,
+                            len(panels), run_id, use_cache, on_success, archiver)
+            for i in indices
+        ]
+        return [future.result() for future in futures]
+
+
+class StreamedPanels:
+    """
+    Panel renders started while the story is still streaming
+    
+    Pass start() as the on_panel callback of StoryGenerator.generate_stream;
+    collect() then waits for the renders and re-renders any panel whose
+    prompt no longer matches the final story (e.g. after a fallback).
+    
+    Renders only produce bytes; collect() archives and checkpoints the
+    ones it keeps, so a superseded render can never overwrite a panel file.
+    """
+    
+    def __init__(self, image_gen: ImageGenerator, run_id: str,
+                 num_panels: int = 4, use_cache: bool = True,
+                 on_success: Optional[Callable[[int, str], None]] = None,
+                 archiver: Optional[ArtifactArchiver] = None):
+        self.image_gen = image_gen
+        self.archiver = archiver
+        self.run_id = run_id
+        self.num_panels = num_panels
+        self.use_cache = use_cache
+        self.on_success = on_success
+        self.executor = ThreadPoolExecutor(max_workers=num_panels,
+                                           thread_name_prefix="panel")
+        self.futures: Dict[int, tuple] = {}
+    
+    def start(self, index: int, panel: Dict):
+        """Submit one panel as soon as the parser emits it"""
+        print(f"  ⚡ 패널 {index+1} 수신, 이미지 생성 시작")
+        self.futures[index] = (panel.get('visual_prompt'), self._submit(index, panel))
+    
+    def _submit(self, index: int, panel: Dict):
+        return self.executor.submit(generate_panel_image, self.image_gen, panel,
+                                    index, self.num_panels, self.run_id, self.use_cache)
+    
+    def collect(self, story: Dict) -> List[Optional[bytes]]:
+        """Wait for every panel of the final story, in panel order"""
+        try:
+            futures = []
+            for i, panel in enumerate(story['panels']):
+                started = self.futures.get(i)
+                if started is None or started[0] != panel.get('visual_prompt'):
+                    if started is not None:
+                        # Superseded: drop it if it has not started yet
+                        started[1].cancel()
+                    started = (panel.get('visual_prompt'), self._submit(i, panel))
+                futures.append(started[1])
+            
+            images = []
+            for i, future in enumerate(futures):
+                data = future.result()
+                if data is not None and self.archiver is not None:
+                    archive_panel_image(self.archiver, data, i, self.run_id, self.on_success)
+                images.append(data)
+            return images
+        finally:
+            # Superseded renders still running finish in the background;
+            # their results are discarded
+            self.abort()
+    
+    def abort(self):
+        """Stop rendering: queued panels are cancelled and results discarded"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WebtoonStages:
+    """
+    The pipeline steps as stage functions over a job dict
+    
+    Each method takes the job, stores its outputs on it and returns it, so
+    the same steps run one after another in run_pipeline or overlapped
+    across webtoons in a StagedPipeline (run_batch). Services are shared.
+    
+    Job keys read: run_id, topic, style, post, num_panels, use_image_cache,
+    refresh_story, stream_story. Progress is checkpointed to the
+    pipeline_runs table after every step (and every finished panel), and a
+    job rebuilt by load_resume_job skips whatever is already done.
+    """
+    
+    STAGE_NAMES = ("story", "panels", "compose", "persist", "publish")
+    
+    def __init__(self, db: Database, story_gen: StoryGenerator,
+                 image_gen: ImageGenerator, composer: ImageComposer,
+                 archiver: Optional[ArtifactArchiver] = None):
+        self.db = db
+        self.story_gen = story_gen
+        self.image_gen = image_gen
+        self.composer = composer
+        self.archiver = archiver
+    
+    def _is_done(self, job: Dict, stage: str) -> bool:
+        """Whether the job's checkpoint is already past a stage"""
+        done = job.get("checkpoint_stage")
+        return done is not None and \
+            self.STAGE_NAMES.index(done) >= self.STAGE_NAMES.index(stage)
+    
+    def _checkpoint(self, job: Dict, stage: str, **fields):
+        job["checkpoint_stage"] = stage
+        self.db.save_run_checkpoint(job["run_id"], stage=stage, **fields)
+    
+    def _abort_streamed_panels(self, job: Dict):
+        """Stop renders started from a stream whose run failed (they would keep spending quota)"""
+        streamed_panels = job.pop("streamed_panels", None)
+        if streamed_panels is not None:
+            streamed_panels.abort()
+    
+    def mark_failed(self, job: Dict, error: str):
+        """Record a failed run so it can be resumed"""
+        self._abort_streamed_panels(job)
+        self.db.save_run_checkpoint(job["run_id"], status="failed", error=error)
+    
+    def story(self, job: Dict) -> Dict:
+        """Step 1: generate the story and save it"""
+        if job.get("story_id") is not None:
+            print(f"\n[1/5] 스토리 재사용: Story #{job['story_id']} ({job['run_id']})")
+            return job
         
-        # Initialize database
-        db = Database(Config.DATABASE_PATH)
+        print(f"\n[1/5] 스토리 생성 중... ({job['run_id']})")
+        self.db.create_run(job["run_id"], job["topic"], job["style"], job.get("post", False))
         
-        # Step 1: Generate story
-        print("\n[1/5] 스토리 생성 중...")
-        story_gen = StoryGenerator(Config.ANTHROPIC_API_KEY)
-        story = story_gen.generate(topic=topic, style=style)
+        try:
+            return self._story(job)
+        except BaseException:
+            self._abort_streamed_panels(job)
+            raise
+    
+    def _story(self, job: Dict) -> Dict:
+        if job.get("stream_story"):
+            # Panel images start rendering while later panels are still streaming
+            job["streamed_panels"] = StreamedPanels(
+                self.image_gen, job["run_id"], num_panels=job["num_panels"],
+                use_cache=job.get("use_image_cache", True),
+                on_success=self._panel_callback(job), archiver=self.archiver
+            )
+            story, from_cache = self.story_gen.generate_stream(
+                topic=job["topic"], style=job["style"], num_panels=job["num_panels"],
+                on_panel=job["streamed_panels"].start,
+                force_refresh=job.get("refresh_story", False)
+            )
+        else:
+            story, from_cache = self.story_gen.generate_with_source(
+                topic=job["topic"], style=job["style"], num_panels=job["num_panels"],
+                force_refresh=job.get("refresh_story", False)
+            )
         
-        # Save story to database
-        story_id = db.insert_story(
-            title=story['title'],
-            topic=topic,
-            style=style,
-            panels_json=json.dumps(story['panels'], ensure_ascii=False)
-        )
+        job["story"] = story
+        job["story_from_cache"] = from_cache
         
         # Save story JSON
-        story_path = Path(Config.STORIES_DIR) / f"story_{timestamp}.json"
+        story_path = Path(Config.STORIES_DIR) / f"story_{job['run_id']}.json"
         story_path.parent.mkdir(parents=True, exist_ok=True)
         with open(story_path, 'w', encoding='utf-8') as f:
             json.dump(story, f, ensure_ascii=False, indent=2)
+        job["story_path"] = str(story_path)
+        
+        # Save story to database together with its checkpoint, so a crash
+        # never leaves a story row the run does not know about
+        with self.db.transaction():
+            job["story_id"] = self.db.insert_story(
+                title=story['title'],
+                topic=job["topic"],
+                style=job["style"],
+                panels_json=json.dumps(story['panels'], ensure_ascii=False)
+            )
+            self._checkpoint(job, "story", story_id=job["story_id"])
         
         print(f"✅ 스토리 저장 완료: {story_path}")
+        return job
+    
+    def _panel_callback(self, job: Dict) -> Callable[[int, str], None]:
+        """Checkpoint each panel image as soon as it is archived"""
+        panel_paths = job.setdefault("panel_paths", {})
         
-        # Step 2: Generate images for each panel
-        print("\n[2/5] 이미지 생성 중...")
-        image_gen = ImageGenerator(
-            provider=Config.IMAGE_GENERATOR,
-            api_token=Config.REPLICATE_API_TOKEN
-        )
+        def on_success(index: int, path: str):
+            panel_paths[index] = path
+            self.db.save_panel_checkpoint(job["run_id"], index, path)
+        
+        return on_success
+    
+    def panels(self, job: Dict) -> Dict:
+        """Step 2: generate every panel image not already checkpointed"""
+        panels = job["story"]['panels']
+        panel_paths = {
+            index: path for index, path in job.get("panel_paths", {}).items()
+            if os.path.exists(path)
+        }
+        job["panel_paths"] = panel_paths
         
-        panel_images = []
-        for i, panel in enumerate(story['panels']):
-            print(f"\n  [{i+1}/4] 패널 이미지 생성 중...")
+        streamed_panels = job.pop("streamed_panels", None)
+        if streamed_panels is not None:
+            print(f"\n[2/5] 이미지 생성 중... ({job['run_id']})")
+            job["panel_images"] = streamed_panels.collect(job["story"])
+        else:
+            missing = [i for i in range(len(panels)) if i not in panel_paths]
+            if missing:
+                print(f"\n[2/5] 이미지 생성 중... ({job['run_id']}, "
+                      f"{len(missing)}/{len(panels)}개 패널)")
+            else:
+                print(f"\n[2/5] 패널 이미지 재사용 ({job['run_id']})")
             
-            try:
-                # Generate image
-                image_url = image_gen.generate(
-                    prompt=panel['visual_prompt'],
-                    width=512,  # Smaller for faster generation
-                    height=512
-                )
-                
-                # Download image
-                image_path = Path(Config.IMAGES_DIR) / f"panel_{timestamp}_{i+1}.png"
-                image_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                image_gen.download_image(image_url, str(image_path))
-                panel_images.append(str(image_path))
-                
-            except Exception as e:
-                print(f"  ❌ 패널 {i+1} 이미지 생성 실패: {str(e)}")
-                import traceback
-                traceback.print_exc()
-                print(f"  ⚠️ Placeholder 사용")
-                # Create placeholder
-                from PIL import Image
-                placeholder = Image.new('RGB', (512, 512), color=f'#{i*50:02x}{i*50:02x}{i*50:02x}')
-                placeholder_path = Path(Config.IMAGES_DIR) / f"panel_{timestamp}_{i+1}_placeholder.png"
-                placeholder_path.parent.mkdir(parents=True, exist_ok=True)
-                placeholder.save(placeholder_path)
-                panel_images.append(str(placeholder_path))
-        
-        # Step 3: Compose webtoon
-        print("\n[3/5] 웹툰 레이아웃 합성 중...")
-        composer = ImageComposer(
-            width=Config.IMAGE_WIDTH,
-            height=Config.IMAGE_HEIGHT
-        )
+            rendered = dict(zip(missing, generate_panel_images(
+                self.image_gen, panels, job["run_id"],
+                use_cache=job.get("use_image_cache", True),
+                indices=missing, on_success=self._panel_callback(job),
+                archiver=self.archiver
+            )))
+            job["panel_images"] = [
+                rendered.get(i, panel_paths.get(i)) for i in range(len(panels))
+            ]
+            
+            if missing and self._is_done(job, "compose"):
+                # New panels invalidate an earlier composition
+                job["checkpoint_stage"] = "panels"
+        
+        if not self._is_done(job, "panels"):
+            self._checkpoint(job, "panels")
+        return job
+    
+    def compose(self, job: Dict) -> Dict:
+        """Step 3: compose the webtoon layout"""
+        if self._is_done(job, "compose") and os.path.exists(job.get("webtoon_path") or ""):
+            print(f"\n[3/5] 웹툰 재사용: {job['webtoon_path']}")
+            return job
         
-        webtoon_path = Path(Config.WEBTOONS_DIR) / f"webtoon_{timestamp}.png"
+        print(f"\n[3/5] 웹툰 레이아웃 합성 중... ({job['run_id']})")
+        
+        webtoon_path = Path(Config.WEBTOONS_DIR) / f"webtoon_{job['run_id']}.png"
         webtoon_path.parent.mkdir(parents=True, exist_ok=True)
         
-        composer.create_layout(panel_images, story, str(webtoon_path))
+        if Config.STRIP_MODE:
+            strip = self.composer.create_strip(
+                job["panel_images"], job["story"], str(webtoon_path),
+                width=Config.STRIP_WIDTH, tile_height=Config.STRIP_TILE_HEIGHT,
+                slice_height=Config.STRIP_SLICE_HEIGHT or None
+            )
+            job["webtoon_path"] = strip["paths"][0]
+            job["slices"] = strip["paths"]
+        elif Config.RENDITIONS:
+            # Extra sizes (feed, square, thumbnails) from the same composition
+            job["renditions"] = self.composer.create_renditions(
+                job["panel_images"], job["story"], str(webtoon_path),
+                renditions=Config.RENDITIONS
+            )
+            job["webtoon_path"] = job["renditions"]["master"]
+        else:
+            job["webtoon_path"] = self.composer.create_layout(
+                job["panel_images"], job["story"], str(webtoon_path)
+            )
         
-        # Save to database
-        webtoon_id = db.insert_webtoon(
-            story_id=story_id,
-            image_path=str(webtoon_path)
-        )
+        self._checkpoint(job, "compose", webtoon_path=job["webtoon_path"])
+        return job
+    
+    def persist(self, job: Dict) -> Dict:
+        """Save the webtoon to the database"""
+        if self.archiver is not None:
+            # Panel files were written in the background during composition;
+            # make sure they (and their checkpoints) exist before finishing
+            failed = self.archiver.wait(job["run_id"])
+            if failed:
+                print(f"  ⚠️ 패널 이미지 {failed}개 보관 실패 (재개 시 다시 생성)")
         
-        # Step 4: Post to Instagram (optional)
-        if post_to_instagram and Config.INSTAGRAM_ACCESS_TOKEN:
+        # A resumed run may have recomposed with a different output format,
+        # so an existing row gets the current path
+        with self.db.transaction():
+            if job.get("webtoon_id") is None:
+                job["webtoon_id"] = self.db.insert_webtoon(
+                    story_id=job["story_id"],
+                    image_path=job["webtoon_path"]
+                )
+            else:
+                self.db.update_webtoon_path(job["webtoon_id"], job["webtoon_path"])
+            
+            self._checkpoint(job, "persist", webtoon_id=job["webtoon_id"])
+        return job
+    
+    def publish(self, job: Dict) -> Dict:
+        """Step 4: post to Instagram (optional)"""
+        if job.get("published"):
+            print("\n[4/5] Instagram 포스팅 완료됨, 건너뛰기")
+        elif job.get("post") and Config.INSTAGRAM_ACCESS_TOKEN:
             print("\n[4/5] Instagram 포스팅 중...")
             
             # Upload image to a public URL first (you'll need to implement this)
@@ -141,32 +463,401 @@ def run_pipeline(topic: str = "직장인 공감", style: str = "유머",
         else:
             print("\n[4/5] Instagram 포스팅 건너뛰기")
         
+        job["published"] = True
+        self._checkpoint(job, "publish", status="completed", error=None)
+        return job
+    
+    def as_stages(self, workers: Optional[Dict[str, int]] = None,
+                  queue_size: int = 2) -> List[Stage]:
+        """
+        Build StagedPipeline stages for these steps
+        
+        Args:
+            workers: Worker count per stage name (default: Config.STAGE_WORKERS)
+            queue_size: Max jobs waiting in front of each stage
+        """
+        workers = {**Config.STAGE_WORKERS, **(workers or {})}
+        return [
+            Stage(name, getattr(self, name), workers=workers.get(name, 1),
+                  queue_size=queue_size)
+            for name in self.STAGE_NAMES
+        ]
+
+
+def make_job(topic: str, style: str, post: bool = False,
+             run_id: Optional[str] = None, use_image_cache: bool = True,
+             refresh_story: bool = False,
+             stream_story: Optional[bool] = None,
+             num_panels: Optional[int] = None) -> Dict:
+    """Create a pipeline job dict"""
+    return {
+        "run_id": run_id or new_run_id(),
+        "topic": topic,
+        "style": style,
+        "post": post,
+        "num_panels": num_panels or Config.NUM_PANELS,
+        "use_image_cache": use_image_cache,
+        "refresh_story": refresh_story,
+        "stream_story": Config.STORY_STREAMING if stream_story is None else stream_story
+    }
+
+
+def job_result(job: Dict) -> Dict:
+    """Summarize a finished job as a run_pipeline-style result"""
+    if "error" in job:
+        return {
+            "success": False,
+            "run_id": job["run_id"],
+            "failed_stage": job.get("failed_stage"),
+            "error": job["error"]
+        }
+    
+    return {
+        "success": True,
+        "run_id": job["run_id"],
+        "story_id": job["story_id"],
+        "story_from_cache": job.get("story_from_cache", False),
+        "webtoon_id": job["webtoon_id"],
+        "webtoon_path": job["webtoon_path"],
+        "renditions": job.get("renditions", {}),
+        "slices": job.get("slices", [])
+    }
+
+
+def create_stages(db: Optional[Database] = None,
+                  story_gen: Optional[StoryGenerator] = None,
+                  image_gen: Optional[ImageGenerator] = None) -> WebtoonStages:
+    """Create the pipeline stages, building any service not given"""
+    db = db or Database(Config.DATABASE_PATH)
+    return WebtoonStages(
+        db=db,
+        story_gen=story_gen or create_story_generator(db),
+        image_gen=image_gen or create_image_generator(),
+        composer=create_composer(),
+        archiver=ArtifactArchiver() if Config.PANEL_ARCHIVE else None
+    )
+
+
+def load_resume_job(db: Database, run_id: str) -> Dict:
+    """
+    Rebuild a job from its checkpoint so finished work is skipped
+    
+    Args:
+        db: Database holding the checkpoint
+        run_id: Run to resume
+    
+    Returns:
+        Job dict for WebtoonStages
+    """
+    run = db.get_run(run_id)
+    if run is None:
+        raise ValueError(f"Unknown run: {run_id}")
+    
+    job = make_job(run["topic"], run["style"], post=bool(run["post"]),
+                   run_id=run_id, stream_story=False)
+    job["checkpoint_stage"] = run["stage"]
+    # Kept apart from checkpoint_stage so re-rendered panels never cause a second post
+    job["published"] = run["stage"] == "publish"
+    job["panel_paths"] = run["panel_paths"]
+    job["webtoon_path"] = run["webtoon_path"]
+    job["webtoon_id"] = run["webtoon_id"]
+    
+    if run["story_id"] is not None:
+        story = db.get_story(run["story_id"])
+        if story is None:
+            raise ValueError(f"Story #{run['story_id']} of run {run_id} not found")
+        job["story_id"] = story["id"]
+        job["story"] = {"title": story["title"], "panels": story["panels"]}
+        job["num_panels"] = len(story["panels"])
+        job["story_path"] = str(Path(Config.STORIES_DIR) / f"story_{run_id}.json")
+    
+    return job
+
+
+def _execute_job(job: Dict, stages: Optional[WebtoonStages] = None,
+                 db: Optional[Database] = None,
+                 story_gen: Optional[StoryGenerator] = None,
+                 image_gen: Optional[ImageGenerator] = None) -> Dict:
+    """Run every stage of one job in order and print the summary"""
+    try:
+        # Validate config
+        Config.validate()
+        
+        stages = stages or create_stages(db, story_gen, image_gen)
+        for name in WebtoonStages.STAGE_NAMES:
+            getattr(stages, name)(job)
+        
         # Step 5: Summary
         print("\n[5/5] 완료!")
         print("\n" + "="*70)
         print("✅ 웹툰 생성 완료!")
         print("="*70)
-        print(f"📖 제목: {story['title']}")
-        print(f"📁 스토리: {story_path}")
-        print(f"🖼️ 웹툰: {webtoon_path}")
-        print(f"💾 데이터베이스 ID: Story #{story_id}, Webtoon #{webtoon_id}")
+        print(f"📖 제목: {job['story']['title']}")
+        print(f"📁 스토리: {job['story_path']}{' (캐시)' if job.get('story_from_cache') else ''}")
+        print(f"🖼️ 웹툰: {job['webtoon_path']}")
+        print(f"💾 데이터베이스 ID: Story #{job['story_id']}, Webtoon #{job['webtoon_id']}")
         print("="*70)
         
-        return {
-            "success": True,
-            "story_id": story_id,
-            "webtoon_id": webtoon_id,
-            "webtoon_path": str(webtoon_path)
-        }
+        return job_result(job)
         
     except Exception as e:
         print(f"\n❌ 파이프라인 실패: {e}")
+        print(f"   재시도: python -m src.main --resume {job['run_id']}")
         import traceback
         traceback.print_exc()
+        if stages is not None:
+            try:
+                if stages.archiver is not None:
+                    # Keep the panels that did finish for --resume
+                    stages.archiver.wait(job["run_id"])
+                stages.mark_failed(job, str(e))
+            except Exception as checkpoint_error:
+                print(f"⚠️ 체크포인트 저장 실패: {checkpoint_error}")
+        return {
+            "success": False,
+            "run_id": job["run_id"],
+            "error": str(e)
+        }
+
+
+def run_pipeline(topic: str = "직장인 공감", style: str = "유머", 
+                post_to_instagram: bool = False,
+                db: Optional[Database] = None,
+                story_gen: Optional[StoryGenerator] = None,
+                image_gen: Optional[ImageGenerator] = None,
+                run_id: Optional[str] = None,
+                use_image_cache: bool = True,
+                refresh_story: bool = False,
+                stream_story: Optional[bool] = None,
+                num_panels: Optional[int] = None):
+    """
+    Run the complete webtoon generation pipeline
+    
+    Args:
+        topic: Story topic
+        style: Story style
+        post_to_instagram: Whether to post to Instagram
+        db: Shared database (created if omitted)
+        story_gen: Shared story generator (created if omitted)
+        image_gen: Shared image generator (created if omitted)
+        run_id: Artifact name suffix (generated if omitted)
+        use_image_cache: False forces fresh panel generations
+        refresh_story: True skips the story response cache
+        stream_story: Stream the story and start panel images as each panel
+            arrives (default: Config.STORY_STREAMING)
+        num_panels: Number of panels (default: Config.NUM_PANELS)
+    """
+    print("="*70)
+    print("🚀 AI 웹툰 자동 생성 파이프라인 시작")
+    print("="*70)
+    
+    job = make_job(topic, style, post=post_to_instagram, run_id=run_id,
+                   use_image_cache=use_image_cache, refresh_story=refresh_story,
+                   stream_story=stream_story, num_panels=num_panels)
+    return _execute_job(job, db=db, story_gen=story_gen, image_gen=image_gen)
+
+
+def resume_pipeline(run_id: str, db: Optional[Database] = None) -> Dict:
+    """
+    Resume a crashed or failed run from its checkpoint
+    
+    The stored story is reused, only panels without a saved image are
+    generated, and composition/persistence/posting run only if they had
+    not finished.
+    
+    Args:
+        run_id: Run ID printed by the failed run
+        db: Shared database (created if omitted)
+    """
+    print("="*70)
+    print(f"🔁 파이프라인 재개: {run_id}")
+    print("="*70)
+    
+    try:
+        db = db or Database(Config.DATABASE_PATH)
+        job = load_resume_job(db, run_id)
+    except Exception as e:
+        print(f"\n❌ 재개 실패: {e}")
         return {
             "success": False,
+            "run_id": run_id,
             "error": str(e)
         }
+    
+    print(f"   마지막 완료 단계: {job['checkpoint_stage'] or '없음'}, "
+          f"저장된 패널 {len(job['panel_paths'])}개")
+    return _execute_job(job, db=db)
+
+
+def recompose_runs(run_ids: List[str], max_workers: Optional[int] = None,
+                   db: Optional[Database] = None) -> Dict:
+    """
+    Re-render the webtoon image of finished runs from their stored panels
+    
+    Stories and panel paths come from the run checkpoints; the layouts are
+    composed in parallel worker processes (ImageComposer.compose_many) and
+    overwrite each run's webtoon file; the run checkpoint and webtoon row
+    are pointed at the new file.
+    
+    Args:
+        run_ids: Runs to recompose
+        max_workers: Worker processes (default: CPU count)
+        db: Shared database (created if omitted)
+    """
+    print("="*70)
+    print(f"🎨 웹툰 재합성: {len(run_ids)}개")
+    print("="*70)
+    
+    db = db or Database(Config.DATABASE_PATH)
+    jobs, results, webtoon_ids = [], {}, {}
+    for run_id in run_ids:
+        run = db.get_run(run_id)
+        story = db.get_story(run["story_id"]) if run and run["story_id"] is not None else None
+        if story is None or not run["panel_paths"]:
+            results[run_id] = {"run_id": run_id, "success": False,
+                               "error": "저장된 스토리/패널 없음"}
+            continue
+        
+        output_path = run["webtoon_path"] or \
+            str(Path(Config.WEBTOONS_DIR) / f"webtoon_{run_id}.png")
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        panels = run["panel_paths"]
+        webtoon_ids[run_id] = run["webtoon_id"]
+        jobs.append({
+            "run_id": run_id,
+            "panel_images": [panels.get(i) for i in range(len(story["panels"]))],
+            "story": {"title": story["title"], "panels": story["panels"]},
+            "output_path": output_path
+        })
+    
+    composer = create_composer()
+    for job, result in zip(jobs, composer.compose_many(jobs, max_workers=max_workers)):
+        results[job["run_id"]] = {"run_id": job["run_id"], **result}
+        if result["success"]:
+            # The output format (extension) may have changed since the run
+            with db.transaction():
+                db.save_run_checkpoint(job["run_id"], webtoon_path=result["output_path"])
+                if webtoon_ids[job["run_id"]] is not None:
+                    db.update_webtoon_path(webtoon_ids[job["run_id"]], result["output_path"])
+    
+    ordered = [results[run_id] for run_id in run_ids]
+    for result in ordered:
+        if result["success"]:
+            print(f"  ✅ {result['run_id']} → {result['output_path']}")
+        else:
+            print(f"  ❌ {result['run_id']} → {result['error']}")
+    
+    return {
+        "success": all(r["success"] for r in ordered),
+        "results": ordered
+    }
+
+
+def load_batch_jobs(jobs_path: str) -> List[Dict]:
+    """
+    Load batch jobs from a JSONL file
+    
+    Each non-empty line is a JSON object with optional "topic", "style",
+    "post" and "num_panels" keys, e.g.
+    {"topic": "개발자 일상", "style": "유머", "post": false}.
+    Lines starting with "#" are ignored.
+    
+    Args:
+        jobs_path: Path to the JSONL file
+    
+    Returns:
+        List of job dicts with defaults filled in
+    """
+    jobs = []
+    with open(jobs_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{jobs_path}:{line_no}: invalid JSON ({e})")
+            
+            jobs.append({
+                "topic": job.get("topic", "직장인 공감"),
+                "style": job.get("style", "유머"),
+                "post": bool(job.get("post", False)),
+                "num_panels": job.get("num_panels")
+            })
+    
+    return jobs
+
+
+def run_batch(jobs_path: str, max_workers: int = None,
+              use_image_cache: bool = True, refresh_story: bool = False) -> Dict:
+    """
+    Run many topic/style jobs through the staged pipeline in one process
+    
+    Each step (story, panels, compose, persist, publish) has its own
+    bounded queue and worker pool, so while one webtoon's panels render the
+    next one's story is being written. The database, story generator and
+    image generator are shared by every job; each job gets its own run ID
+    so artifacts never collide.
+    
+    Args:
+        jobs_path: Path to a JSONL jobs file (see load_batch_jobs)
+        max_workers: Webtoons rendering panels at once
+            (default: Config.STAGE_WORKERS["panels"])
+        use_image_cache: False forces fresh panel generations
+        refresh_story: True skips the story response cache
+    
+    Returns:
+        Dict with overall success and per-job results (in job order)
+    """
+    jobs = load_batch_jobs(jobs_path)
+    workers = {"panels": max_workers} if max_workers else {}
+    
+    Config.validate()
+    
+    stages = create_stages()
+    pipeline_stages = stages.as_stages(workers, queue_size=Config.STAGE_QUEUE_SIZE)
+    
+    print("="*70)
+    print(f"📦 배치 모드: {len(jobs)}개 작업 ("
+          + ", ".join(f"{stage.name}×{stage.workers}" for stage in pipeline_stages) + ")")
+    print("="*70)
+    
+    with StagedPipeline(pipeline_stages) as pipeline:
+        for job in jobs:
+            pipeline.submit(make_job(
+                job["topic"], job["style"], post=job["post"],
+                use_image_cache=use_image_cache, refresh_story=refresh_story,
+                num_panels=job["num_panels"]
+            ))
+    if stages.archiver is not None:
+        # Panels of failed jobs may still be in flight
+        stages.archiver.wait()
+    for job in pipeline.results:
+        if "error" in job:
+            stages.mark_failed(job, job["error"])
+    results = [job_result(job) for job in pipeline.results]
+    
+    # Summary
+    succeeded = sum(1 for r in results if r.get("success"))
+    print("\n" + "="*70)
+    print(f"📊 배치 결과: {succeeded}/{len(results)} 성공 "
+          f"(스토리 캐시 {stages.story_gen.cache_hits}회 적중)")
+    print("="*70)
+    for i, (job, result) in enumerate(zip(jobs, results), 1):
+        if result.get("success"):
+            print(f"  ✅ [{i}] {job['topic']} / {job['style']} → {result['webtoon_path']}")
+        else:
+            print(f"  ❌ [{i}] {job['topic']} / {job['style']} → "
+                  f"[{result.get('failed_stage')}] {result.get('error')} "
+                  f"(--resume {result['run_id']})")
+    print("="*70)
+    
+    return {
+        "success": succeeded == len(results),
+        "results": results
+    }
 
 
 if __name__ == "__main__":
@@ -176,14 +867,52 @@ if __name__ == "__main__":
     parser.add_argument("--topic", default="직장인 공감", help="웹툰 주제")
     parser.add_argument("--style", default="유머", help="웹툰 스타일")
     parser.add_argument("--post", action="store_true", help="Instagram 포스팅")
+    parser.add_argument("--panels", type=int, default=None,
+                        help="컷 수 (기본: NUM_PANELS)")
+    parser.add_argument("--batch", metavar="JOBS_JSONL",
+                        help="topic/style/post 작업 목록(JSONL)을 한 번에 실행")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="실패한 실행을 체크포인트부터 재개")
+    parser.add_argument("--recompose", metavar="RUN_ID", nargs="+",
+                        help="저장된 스토리/패널로 웹툰 이미지를 다시 합성")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="배치 모드에서 동시에 패널을 생성할 웹툰 수 "
+                             "(--recompose: 합성 프로세스 수)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="이미지 캐시를 건너뛰고 새로 생성")
+    parser.add_argument("--refresh-story", action="store_true",
+                        help="스토리 캐시를 건너뛰고 새로 생성")
+    parser.add_argument("--stream", action="store_true", default=None,
+                        help="스토리를 스트리밍하며 패널 이미지 생성을 바로 시작")
+    parser.add_argument("--compact-metrics", action="store_true",
+                        help="오래된 게시물 지표 기록을 시간/일 단위로 압축하고 종료")
     
     args = parser.parse_args()
     
-    result = run_pipeline(
-        topic=args.topic,
-        style=args.style,
-        post_to_instagram=args.post
-    )
+    if args.compact_metrics:
+        result = Database(Config.DATABASE_PATH).downsample_metrics_history()
+        tiers = ", ".join(f"{name} {count}" for name, count in result["deleted"].items())
+        print(f"🗜️ 지표 기록 압축: {sum(result['deleted'].values())}행 삭제 ({tiers}), "
+              f"{result['rows']}행 유지")
+        result["success"] = True
+    elif args.resume:
+        result = resume_pipeline(args.resume)
+    elif args.recompose:
+        result = recompose_runs(args.recompose, max_workers=args.workers)
+    elif args.batch:
+        result = run_batch(args.batch, max_workers=args.workers,
+                           use_image_cache=not args.no_cache,
+                           refresh_story=args.refresh_story)
+    else:
+        result = run_pipeline(
+            topic=args.topic,
+            style=args.style,
+            post_to_instagram=args.post,
+            use_image_cache=not args.no_cache,
+            refresh_story=args.refresh_story,
+            stream_story=args.stream,
+            num_panels=args.panels
+        )
     
     # Exit with appropriate code for CI
     if not result.get("success", False):
@@ -0,0 +1,109 @@
+"""
+Background archival of in-memory artifacts (panel images)
+"""
+import sys
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+class ArtifactArchiver:
+    """
+    Write in-memory artifacts to disk off the critical path
+
+    The pipeline hands encoded panel bytes straight to the composer and
+    queues the disk write here. Writes are atomic (temp file + rename), so
+    a file that exists is complete. Futures are grouped (e.g. by run ID)
+    so a later step can wait for one run's files only.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Initialize archiver
+
+        Args:
+            max_workers: Writer threads
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="archive")
+        self.written = 0
+        self.failed = 0
+        self.bytes = 0
+        self._groups: Dict[str, List[Future]] = {}
+        self._lock = threading.Lock()
+
+    def archive(self, data: bytes, path: str, group: Optional[str] = None,
+                on_done: Optional[Callable[[str], None]] = None) -> Future:
+        """
+        Queue a write
+
+        Args:
+            data: Bytes to write
+            path: Destination file
+            group: Group the write belongs to (see wait())
+            on_done: Called with the path once the file is on disk
+
+        Returns:
+            Future resolving to the path
+        """
+        future = self.executor.submit(self._write, data, path, on_done)
+        if group is not None:
+            with self._lock:
+                self._groups.setdefault(group, []).append(future)
+        return future
+
+    def wait(self, group: Optional[str] = None) -> int:
+        """
+        Wait for queued writes
+
+        Args:
+            group: Only this group's writes (default: all)
+
+        Returns:
+            Number of failed writes waited on
+        """
+        with self._lock:
+            if group is None:
+                futures = [f for group_futures in self._groups.values() for f in group_futures]
+                self._groups.clear()
+            else:
+                futures = self._groups.pop(group, [])
+
+        wait(futures)
+        return sum(1 for f in futures if f.exception() is not None)
+
+    def shutdown(self):
+        """Finish every queued write and stop the writer threads"""
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            self._groups.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"written": self.written, "failed": self.failed, "bytes": self.bytes}
+
+    def _write(self, data: bytes, path: str,
+               on_done: Optional[Callable[[str], None]]) -> str:
+        try:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"❌ 파일 보관 실패: {path}: {e}")
+            with self._lock:
+                self.failed += 1
+            raise
+
+        with self._lock:
+            self.written += 1
+            self.bytes += len(data)
+
+        if on_done is not None:
+            on_done(path)
+        return path
@@ -0,0 +1,199 @@
+"""
+Streaming, pooled, resumable file downloads
+"""
+import sys
+import io
+import os
+import time
+import hashlib
+import threading
+import requests
+from contextlib import nullcontext
+from requests.adapters import HTTPAdapter
+from typing import Callable, ContextManager, Dict, Optional
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+# Errors worth retrying (the connection dropped or the server hiccuped)
+RETRYABLE_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.Timeout,
+)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class IncompleteDownload(IOError):
+    """Raised when the body ended before Content-Length bytes arrived"""
+
+
+class Downloader:
+    """Download files over a shared keep-alive session"""
+
+    def __init__(self, pool_size: int = 16, timeout: int = 30,
+                 max_retries: int = 3, backoff: float = 1.0,
+                 chunk_size: int = 64 * 1024):
+        """
+        Initialize downloader
+
+        Args:
+            pool_size: Connections kept alive per host
+            timeout: Connect/read timeout in seconds
+            max_retries: Retries after the first attempt
+            backoff: Base delay in seconds (doubled on each retry)
+            chunk_size: Bytes read and written per chunk
+        """
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.chunk_size = chunk_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def download(self, url: str, save_path: str) -> Dict:
+        """
+        Stream a URL to save_path
+
+        The body is written in chunks to ``save_path + ".part"`` and renamed
+        into place only once complete. A dropped connection resumes with an
+        HTTP Range request from the bytes already on disk.
+
+        Args:
+            url: File URL
+            save_path: Destination path
+
+        Returns:
+            Dict with path, sha256, bytes and attempts
+        """
+        part_path = f"{save_path}.part"
+
+        # Never resume from a .part left by an earlier, unrelated run
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+        try:
+            result = self._download(url, lambda resume: open(part_path, 'ab' if resume else 'wb'))
+        except Exception:
+            self._discard(part_path)
+            raise
+
+        os.replace(part_path, save_path)
+        return {"path": save_path, **result}
+
+    def fetch_bytes(self, url: str) -> Dict:
+        """
+        Download a URL into memory
+
+        Same streaming, retry and Range-resume behavior as download(), but
+        nothing touches the disk.
+
+        Args:
+            url: File URL
+
+        Returns:
+            Dict with data, sha256, bytes and attempts
+        """
+        buffer = io.BytesIO()
+
+        def open_buffer(resume: bool):
+            if not resume:
+                buffer.seek(0)
+                buffer.truncate()
+            return nullcontext(buffer)
+
+        result = self._download(url, open_buffer)
+        return {"data": buffer.getvalue(), **result}
+
+    def _download(self, url: str, open_sink: Callable[[bool], ContextManager]) -> Dict:
+        """
+        Fetch url into a sink, retrying and resuming
+
+        Args:
+            url: File URL
+            open_sink: Called with resume=True to append to what was received,
+                resume=False to start over; returns a writable context manager
+
+        Returns:
+            Dict with sha256, bytes and attempts
+        """
+        # Progress survives failed attempts so the next one can resume
+        state = {"received": 0, "hasher": hashlib.sha256()}
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self._fetch(url, open_sink, state)
+                break
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRYABLE_STATUS or attempt > self.max_retries:
+                    raise
+                reason = f"HTTP {status}"
+            except RETRYABLE_ERRORS + (IncompleteDownload,) as e:
+                if attempt > self.max_retries:
+                    raise
+                reason = str(e)
+
+            delay = self.backoff * (2 ** (attempt - 1))
+            print(f"  ⚠️ 다운로드 재시도 {attempt}/{self.max_retries} "
+                  f"({state['received']} bytes 수신, {delay:.1f}초 후): {reason}")
+            time.sleep(delay)
+
+        return {
+            "sha256": state["hasher"].hexdigest(),
+            "bytes": state["received"],
+            "attempts": attempt
+        }
+
+    def _fetch(self, url: str, open_sink: Callable[[bool], ContextManager], state: Dict):
+        """One download attempt, resuming after state["received"] bytes if possible"""
+        headers = {"Range": f"bytes={state['received']}-"} if state["received"] else {}
+
+        with self.session.get(url, headers=headers, stream=True,
+                              timeout=self.timeout) as response:
+            response.raise_for_status()
+
+            if state["received"] and response.status_code != 206:
+                # Server ignored the Range header: start over
+                state["received"] = 0
+                state["hasher"] = hashlib.sha256()
+
+            expected = response.headers.get("Content-Length")
+            if expected is not None:
+                expected = state["received"] + int(expected)
+
+            with open_sink(state["received"] > 0) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    if not chunk:
+                        continue
+                    f.write(chunk)
+                    state["hasher"].update(chunk)
+                    state["received"] += len(chunk)
+
+        if expected is not None and state["received"] < expected:
+            raise IncompleteDownload(f"received {state['received']} of {expected} bytes")
+
+    @staticmethod
+    def _discard(part_path: str):
+        try:
+            os.remove(part_path)
+        except FileNotFoundError:
+            pass
+
+
+_shared_downloader: Optional[Downloader] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_downloader() -> Downloader:
+    """Get the process-wide downloader (one connection pool per process)"""
+    global _shared_downloader
+    with _shared_lock:
+        if _shared_downloader is None:
+            _shared_downloader = Downloader()
+        return _shared_downloader
@@ -0,0 +1,134 @@
+"""
+Font registry - resolves fonts once and caches loaded faces
+"""
+import sys
+import threading
+from PIL import ImageFont
+from typing import Dict, List, Optional, Tuple
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+class FontRegistry:
+    """
+    Resolve the best available font per family and cache loaded faces
+
+    Each family is a list of candidate font files, best first (Korean
+    capable fonts ahead of Latin-only ones). The first candidate that loads
+    is remembered, and faces are cached by (family, size), so a font file
+    is parsed once per size per process instead of on every draw call.
+    """
+
+    FAMILIES: Dict[str, List[str]] = {
+        "sans": [
+            "malgun.ttf",
+            "/usr/share/fonts/truetype/nanum/NanumBarunGothic.ttf",
+            "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
+            "/System/Library/Fonts/AppleSDGothicNeo.ttc",
+            "arial.ttf",
+            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+            "DejaVuSans.ttf"
+        ]
+    }
+
+    def __init__(self, families: Optional[Dict[str, List[str]]] = None):
+        """
+        Initialize font registry
+
+        Args:
+            families: Family name -> candidate font files (default: FAMILIES)
+        """
+        self.families = families or self.FAMILIES
+        self.hits = 0
+        self.misses = 0
+        self._paths: Dict[str, Optional[str]] = {}
+        self._fonts: Dict[Tuple[str, int], ImageFont.ImageFont] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, family: str = "sans") -> Optional[str]:
+        """
+        Get the font file used for a family
+
+        Returns:
+            Path of the first loadable candidate, or None if none loads
+            (the Pillow default font is used then)
+        """
+        with self._lock:
+            return self._resolve(family)
+
+    def _resolve(self, family: str) -> Optional[str]:
+        if family in self._paths:
+            return self._paths[family]
+
+        if family not in self.families:
+            raise ValueError(f"Unknown font family: {family}")
+
+        path = None
+        for candidate in self.families[family]:
+            try:
+                ImageFont.truetype(candidate, 10)
+                path = candidate
+                break
+            except OSError:
+                continue
+
+        if path is None:
+            print(f"⚠️ '{family}' 폰트를 찾을 수 없어 기본 폰트를 사용합니다")
+
+        self._paths[family] = path
+        return path
+
+    def get(self, size: int, family: str = "sans") -> ImageFont.ImageFont:
+        """
+        Get a font face
+
+        Args:
+            size: Font size in pixels
+            family: Font family name
+
+        Returns:
+            Cached FreeTypeFont (or the Pillow default font)
+        """
+        key = (family, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self.hits += 1
+                return font
+
+            self.misses += 1
+            path = self._resolve(family)
+            if path is not None:
+                font = ImageFont.truetype(path, size)
+            else:
+                try:
+                    font = ImageFont.load_default(size=size)
+                except TypeError:
+                    # Pillow < 10.1 has no sized default font
+                    font = ImageFont.load_default()
+
+            self._fonts[key] = font
+            return font
+
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "cached_faces": len(self._fonts),
+                "resolved": dict(self._paths)
+            }
+
+
+_default_registry: Optional[FontRegistry] = None
+_default_lock = threading.Lock()
+
+
+def get_font_registry() -> FontRegistry:
+    """Get the process-wide font registry"""
+    global _default_registry
+    with _default_lock:
+        if _default_registry is None:
+            _default_registry = FontRegistry()
+        return _default_registry
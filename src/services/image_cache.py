@@ -0,0 +1,199 @@
+"""
+Content-addressed on-disk cache for generated images
+"""
+import sys
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+class ImageCache:
+    """
+    Disk cache of generated image bytes
+
+    Entries are keyed by (provider, model, prompt, width, height) and stored
+    under ``<cache_dir>/<key[:2]>/<key>.png``. Sizes and last access times
+    live in a SQLite index (WAL, so concurrent runs share it safely); a hit
+    updates one row, and the cache is kept under a byte budget by evicting
+    the least recently used entries.
+    """
+
+    INDEX_FILE = "index.db"
+    LEGACY_INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        """
+        Initialize image cache
+
+        Args:
+            cache_dir: Directory holding cached images and the index
+            max_bytes: Total size budget; LRU entries are evicted above it
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = self._open_index()
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str,
+                 width: int, height: int) -> str:
+        """Build the cache key for a generation request"""
+        payload = json.dumps([provider, model, prompt, width, height],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _open_index(self) -> sqlite3.Connection:
+        """Open (and create) the index, importing a legacy JSON index once"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Shared by the panel threads under self._lock
+        conn = sqlite3.connect(str(self.cache_dir / self.INDEX_FILE),
+                               timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    meta TEXT
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access)"
+            )
+
+        legacy_path = self.cache_dir / self.LEGACY_INDEX_FILE
+        if legacy_path.exists():
+            try:
+                with open(legacy_path, 'r', encoding='utf-8') as f:
+                    legacy = json.load(f)
+                with conn:
+                    conn.executemany(
+                        """INSERT OR IGNORE INTO entries (key, size, created, last_access, meta)
+                           VALUES (?, ?, ?, ?, ?)""",
+                        [(key, entry.pop("size"), entry.pop("created"), entry.pop("last_access"),
+                          json.dumps(entry)) for key, entry in legacy.items()]
+                    )
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ 이미지 캐시 인덱스 손상, 무시합니다: {e}")
+            legacy_path.unlink()
+
+        return conn
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """
+        Read a cached image into memory
+
+        Returns:
+            Image bytes on a hit, None on a miss
+        """
+        path = self._lookup(key)
+        if path is None:
+            return None
+
+        return path.read_bytes()
+
+    def put_bytes(self, key: str, data: bytes, **meta) -> str:
+        """
+        Store image bytes in the cache
+
+        Args:
+            key: Cache key (see make_key)
+            data: Encoded image
+            **meta: Extra fields kept in the index (provider, model, ...)
+
+        Returns:
+            Path of the cached file
+        """
+        return self._store(key, lambda tmp_path: tmp_path.write_bytes(data), meta)
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        """Path of a cached entry, updating hit/miss counts and access time"""
+        path = self._entry_path(key)
+        with self._lock, self._conn:
+            if not path.exists():
+                # Drop an entry whose file was removed by hand
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+
+            updated = self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            ).rowcount
+            if not updated:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        return path
+
+    def _store(self, key: str, write: Callable[[Path], object], meta: Dict) -> str:
+        """Write an entry through a temp file and index it"""
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock, self._conn:
+            # Take the write lock first so concurrent runs evict consistently
+            self._conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            self._conn.execute(
+                """INSERT OR REPLACE INTO entries (key, size, created, last_access, meta)
+                   VALUES (?, ?, ?, ?, ?)""",
+                (key, path.stat().st_size, now, now, json.dumps(meta))
+            )
+            self._evict()
+
+        return str(path)
+
+    def _evict(self):
+        """Drop least recently used entries until under budget (caller holds the lock)"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        for key, size in self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            evicted.append(key)
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in evicted])
+        for key in evicted:
+            try:
+                self._entry_path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict:
+        """Get cache statistics"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            return {
+                "entries": entries,
+                "bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
@@ -2,195 +2,543 @@
 Image composition service - combines panels into webtoon layout
 """
 import sys
-from PIL import Image, ImageDraw, ImageFont
-from typing import List, Dict, Tuple
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from PIL import Image, ImageDraw
+from typing import List, Dict, Optional
 import os
 
+from .fonts import FontRegistry, get_font_registry
+from .image_encoder import ImageEncoder
+from .text_layout import TextLayout, get_text_layout
+from .panel_prep import PanelSource, panel_size, prepare_panel
+from .png_stream import PngStreamWriter
+from .layouts import Cell, Layout, get_layout
+
 # UTF-8 encoding
 sys.stdout.reconfigure(encoding='utf-8')
 
 class ImageComposer:
-    """Compose 4-panel webtoon layout"""
+    """Compose webtoon layouts (2x2 grid, vertical, 3-panel or N-panel strip)"""
+    
+    # Speech bubble colors by emotion
+    EMOTION_COLORS = {
+        "행복": "#FFE5E5",
+        "놀람": "#FFF4E5",
+        "화남": "#FFE5E5",
+        "슬픔": "#E5F0FF",
+        "당황": "#FFF4E5",
+        "의아함": "#F0F0F0",
+        "중립": "#FFFFFF"
+    }
+    
+    PLACEHOLDER_COLORS = ['#FFE5E5', '#E5F0FF', '#E5FFE5', '#FFF4E5']
     
-    def __init__(self, width: int = 1080, height: int = 1920):
+    # Output renditions (width, height)
+    RENDITIONS = {
+        "story": (1080, 1920),
+        "feed": (1080, 1350),
+        "square": (1080, 1080),
+        "thumb": (270, 480),
+        "thumb_square": (240, 240)
+    }
+    
+    def __init__(self, width: int = 1080, height: int = 1920,
+                 fonts: Optional[FontRegistry] = None, fit_mode: str = "crop",
+                 layout: str = "auto", encoder: Optional[ImageEncoder] = None,
+                 max_cached_bases: int = 4):
         """
         Initialize composer
         
         Args:
             width: Total width (Instagram optimized: 1080)
             height: Total height (Instagram optimized: 1920)
+            fonts: Font registry (default: the shared process-wide one)
+            fit_mode: How panels fill their cell: "crop", "fit" or "stretch"
+            layout: Layout name (see layouts.LAYOUTS) or "auto" to pick one
+                by panel count
+            encoder: Output encoder (default: optimized PNG)
+            max_cached_bases: Panel layers kept for text-only re-renders
+                (about 6MB each at 1080x1920; 0 disables the cache)
         """
+        self.fonts = fonts or get_font_registry()
+        self.text = TextLayout(fonts) if fonts else get_text_layout()
+        self.encoder = encoder or ImageEncoder()
+        self.fit_mode = fit_mode
+        self.layout = layout
         self.width = width
         self.height = height
-        self.panel_width = width // 2
-        self.panel_height = height // 2
+        self.max_cached_bases = max_cached_bases
+        self.base_hits = 0
+        self.base_misses = 0
+        self._bases: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._base_lock = threading.Lock()
     
-    def create_layout(self, panel_images: List[str], story: Dict, 
-                     output_path: str) -> str:
+    def create_layout(self, panel_images: List[Optional[PanelSource]], story: Dict, 
+                     output_path: str, layout: Optional[str] = None) -> str:
         """
-        Create 4-panel webtoon layout
+        Create webtoon layout
         
         Args:
-            panel_images: List of 4 image file paths
+            panel_images: Panel images (paths or encoded bytes; None draws a
+                placeholder), one per story panel
             story: Story dict with title and panels
-            output_path: Path to save the final webtoon
+            output_path: Path to save the final webtoon (the extension is
+                set by the encoder's format)
+            layout: Layout name overriding the composer's default
         
         Returns:
             Path to the saved webtoon
         """
-        print(f"🎨 4컷 레이아웃 생성 중: {story['title']}")
+        webtoon = self.render(panel_images, story, layout)
+        return self._save(webtoon, output_path)
+    
+    def create_renditions(self, panel_images: List[Optional[PanelSource]], story: Dict,
+                          output_path: str, renditions: Optional[List[str]] = None,
+                          layout: Optional[str] = None,
+                          max_workers: int = 4) -> Dict[str, str]:
+        """
+        Create the webtoon plus resized renditions from one composition pass
         
-        # Create base image
-        webtoon = Image.new('RGB', (self.width, self.height), color='white')
-        draw = ImageDraw.Draw(webtoon)
+        Panels are decoded and composed once into the master canvas
+        (width x height, saved to output_path). Each rendition is resized
+        from the smallest already derived image of the same aspect ratio
+        (e.g. thumb from story), falling back to the master, and letterboxed
+        when its aspect ratio differs so no panel is cut. Outputs are encoded
+        in parallel threads.
         
-        # Panel positions (2x2 grid)
-        positions = [
-            (0, 0),                                    # Top-left
-            (self.panel_width, 0),                     # Top-right
-            (0, self.panel_height),                    # Bottom-left
-            (self.panel_width, self.panel_height)      # Bottom-right
-        ]
+        Args:
+            panel_images: Panel images (paths or encoded bytes; None draws a
+                placeholder), one per story panel
+            story: Story dict with title and panels
+            output_path: Path of the master webtoon; renditions are saved
+                next to it as <name>_<rendition><ext>
+            renditions: Names from RENDITIONS (default: all)
+            layout: Layout name overriding the composer's default
+            max_workers: Encoder threads
+        
+        Returns:
+            {"master": path, rendition name: path, ...}
+        """
+        names = list(self.RENDITIONS) if renditions is None else list(renditions)
+        unknown = [n for n in names if n not in self.RENDITIONS]
+        if unknown:
+            raise ValueError(f"Unknown rendition: {', '.join(unknown)} "
+                             f"(available: {', '.join(self.RENDITIONS)})")
+        
+        master = self.render(panel_images, story, layout)
+        images = {"master": master}
+        stem = Path(output_path)
+        paths = {"master": str(stem)}
+        
+        # Largest first, so smaller renditions can cascade from larger ones
+        derived = [master]
+        for name in sorted(names, key=lambda n: -(self.RENDITIONS[n][0] * self.RENDITIONS[n][1])):
+            size = self.RENDITIONS[name]
+            if size == master.size:
+                images[name] = master
+                continue
+            
+            source = min(
+                (img for img in derived if _same_aspect(img.size, size)
+                 and img.width >= size[0] and img.height >= size[1]),
+                key=lambda img: img.width * img.height, default=master
+            )
+            mode = "stretch" if _same_aspect(source.size, size) else "fit"
+            images[name] = prepare_panel(source, size, mode=mode)
+            derived.append(images[name])
+            paths[name] = str(stem.with_name(f"{stem.stem}_{name}{stem.suffix}"))
+        
+        # Encode everything in parallel (Pillow releases the GIL while encoding)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {name: executor.submit(self._save, images[name], path)
+                       for name, path in paths.items()}
+            saved = {name: future.result() for name, future in futures.items()}
+        
+        # Renditions at master size share the master file
+        return {name: saved.get(name, saved["master"]) for name in ["master"] + names}
+    
+    def render(self, panel_images: List[Optional[PanelSource]], story: Dict,
+               layout: Optional[str] = None) -> Image.Image:
+        """
+        Compose the webtoon canvas in memory
+        
+        The panel layer (chrome plus placed panels) comes from the base
+        cache when the same panels were composed before; only the text
+        layer (title and speech bubbles) is drawn per call.
+        
+        Args:
+            panel_images: Panel images (paths or encoded bytes; None draws a
+                placeholder), one per story panel
+            story: Story dict with title and panels
+            layout: Layout name overriding the composer's default
+        
+        Returns:
+            RGB image of width x height
+        """
+        chosen = get_layout(layout or self.layout, len(panel_images))
+        print(f"🎨 {len(panel_images)}컷 레이아웃({chosen.name}) 생성 중: {story['title']}")
+        
+        webtoon = self.render_base(panel_images, layout).copy()
+        self._draw_text(webtoon, story, chosen, len(panel_images))
+        return webtoon
+    
+    def render_variants(self, panel_images: List[Optional[PanelSource]], story: Dict,
+                        variants: List[Dict], layout: Optional[str] = None) -> List[Image.Image]:
+        """
+        Render text variants (e.g. A/B titles or dialogue) over one panel layer
+        
+        Args:
+            panel_images: Panel images, one per story panel
+            story: Base story dict with title and panels
+            variants: Overrides per variant: "title" and/or "dialogues"
+                (one string per panel, None keeps the base line)
+            layout: Layout name overriding the composer's default
+        
+        Returns:
+            One image per variant
+        """
+        chosen = get_layout(layout or self.layout, len(panel_images))
+        base = self.render_base(panel_images, layout)
+        print(f"🎨 텍스트 변형 {len(variants)}개 렌더링: {story['title']}")
+        
+        images = []
+        for variant in variants:
+            image = base.copy()
+            self._draw_text(image, _apply_variant(story, variant), chosen, len(panel_images))
+            images.append(image)
+        return images
+    
+    def create_variants(self, panel_images: List[Optional[PanelSource]], story: Dict,
+                        variants: List[Dict], output_path: str,
+                        layout: Optional[str] = None, max_workers: int = 4) -> List[str]:
+        """
+        Render and save text variants, encoded in parallel threads
+        
+        Args:
+            panel_images: Panel images, one per story panel
+            story: Base story dict with title and panels
+            variants: See render_variants
+            output_path: Base path; variants are saved as <name>_v1<ext>, ...
+            layout: Layout name overriding the composer's default
+            max_workers: Encoder threads
+        
+        Returns:
+            Saved paths, in variant order
+        """
+        images = self.render_variants(panel_images, story, variants, layout)
+        stem = Path(output_path)
+        paths = [str(stem.with_name(f"{stem.stem}_v{i+1}{stem.suffix}"))
+                 for i in range(len(images))]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self._save, images, paths))
+    
+    def render_base(self, panel_images: List[Optional[PanelSource]],
+                    layout: Optional[str] = None) -> Image.Image:
+        """
+        Panel layer: chrome plus placed panels, without any text
+        
+        Cached under a hash of the layout, canvas size, fit mode and panel
+        contents (LRU, max_cached_bases entries). The returned image is
+        shared; copy it before drawing.
+        """
+        num_panels = len(panel_images)
+        chosen = get_layout(layout or self.layout, num_panels)
+        key = self._base_key(chosen.name, panel_images)
+        
+        with self._base_lock:
+            base = self._bases.get(key)
+            if base is not None:
+                self._bases.move_to_end(key)
+                self.base_hits += 1
+                print("  ⚡ 패널 레이어 캐시 사용")
+                return base
+            self.base_misses += 1
+        
+        # Start from the cached static chrome (background, title bar, borders)
+        base = chosen.chrome(self.width, self.height, num_panels).copy()
+        draw = ImageDraw.Draw(base)
+        cells = chosen.cells(self.width, self.height, num_panels)
+        complete = True
         
         # Place panels
-        for i, (img_path, pos) in enumerate(zip(panel_images, positions)):
+        for i, (img_path, cell) in enumerate(zip(panel_images, cells)):
+            x, y, w, h = cell
+            if img_path is None:
+                # Generation failed upstream
+                print(f"  ⚠️ [{i+1}컷] Placeholder 사용")
+                self._draw_placeholder(draw, cell, i+1)
+                continue
             try:
-                panel = Image.open(img_path)
-                panel = panel.resize((self.panel_width - 10, self.panel_height - 10))
-                webtoon.paste(panel, (pos[0] + 5, pos[1] + 5))
+                panel = prepare_panel(img_path, (w, h), mode=self.fit_mode)
+                base.paste(panel, (x, y))
                 
                 print(f"  [{i+1}컷] 배치 완료")
                 
             except Exception as e:
                 print(f"  ❌ [{i+1}컷] 배치 실패: {e}")
                 # Use placeholder
-                self._draw_placeholder(draw, pos, i+1)
+                self._draw_placeholder(draw, cell, i+1)
+                complete = False
         
-        # Draw grid lines
-        line_width = 5
-        draw.line([(self.width//2, 0), (self.width//2, self.height)], 
-                 fill='black', width=line_width)
-        draw.line([(0, self.height//2), (self.width, self.height//2)], 
-                 fill='black', width=line_width)
+        # A panel that failed to load may load next time, so don't keep it
+        if complete and self.max_cached_bases > 0:
+            with self._base_lock:
+                self._bases[key] = base
+                while len(self._bases) > self.max_cached_bases:
+                    self._bases.popitem(last=False)
+        return base
+    
+    def _base_key(self, layout_name: str, panel_images: List[Optional[PanelSource]]) -> str:
+        """Content hash of everything the panel layer depends on"""
+        digest = hashlib.sha256()
+        digest.update(repr((layout_name, self.width, self.height, self.fit_mode)).encode())
+        for source in panel_images:
+            if source is None:
+                digest.update(b"placeholder")
+            elif isinstance(source, (bytes, bytearray)):
+                digest.update(hashlib.sha256(source).digest())
+            elif isinstance(source, Image.Image):
+                digest.update(hashlib.sha256(source.tobytes()).digest())
+            else:
+                # Files: path plus size/mtime, so an overwritten file misses
+                try:
+                    stat = os.stat(source)
+                    digest.update(repr((str(source), stat.st_size, stat.st_mtime_ns)).encode())
+                except OSError:
+                    digest.update(repr((str(source), None)).encode())
+            digest.update(b"|")
+        return digest.hexdigest()
+    
+    def _draw_text(self, webtoon: Image.Image, story: Dict, chosen: Layout, num_panels: int):
+        """Text layer: title and speech bubbles"""
+        draw = ImageDraw.Draw(webtoon)
+        cells = chosen.cells(self.width, self.height, num_panels)
         
         # Add title
-        self._add_title(draw, story['title'])
+        self._add_title(draw, story['title'], chosen.title_height)
         
         # Add speech bubbles
-        for i, panel in enumerate(story['panels']):
-            self._add_speech_bubble(draw, panel['dialogue'], positions[i], 
+        for panel, cell in zip(story['panels'], cells):
+            self._add_speech_bubble(draw, panel['dialogue'], cell, 
                                    panel.get('emotion', '중립'))
+    
+    def create_strip(self, panel_images: List[Optional[PanelSource]], story: Dict,
+                     output_path: str, width: int = 800, tile_height: int = 1024,
+                     slice_height: Optional[int] = None, gap: int = 40) -> Dict:
+        """
+        Render a vertical scroll strip in horizontal tiles
+        
+        Panels are stacked full width at their own aspect ratio (sizes are
+        read from the image headers up front), so the strip can be any
+        height. Only one tile plus the panels crossing it are in memory at
+        a time; tiles are streamed into PNG files, either one file or
+        slices of at most slice_height pixels for platforms that limit
+        image height.
+        
+        Args:
+            panel_images: Panel images (paths or encoded bytes; None draws a
+                placeholder), one per story panel
+            story: Story dict with title and panels
+            output_path: Strip PNG path (slices: <name>_01.png, ...)
+            width: Strip width
+            tile_height: Rows rendered per tile (bounds peak memory)
+            slice_height: Max height of each output file (None: one file)
+            gap: White space between panels
+        
+        Returns:
+            {"paths": [...], "width", "height", "tiles"}
+        """
+        title_height = 120
+        print(f"🎨 세로 스트립 생성 중 ({len(panel_images)}컷, 폭 {width}px): {story['title']}")
+        
+        # Plan: (top, height, image path) per panel
+        plan, y = [], title_height + gap
+        for img_path in panel_images:
+            try:
+                src_w, src_h = panel_size(img_path)
+                panel_height = max(1, round(width * src_h / src_w))
+            except Exception:
+                img_path, panel_height = None, width
+            plan.append((y, panel_height, img_path))
+            y += panel_height + gap
+        total_height = y
+        
+        title_bar = Image.new('RGB', (width, title_height), color='#333333')
+        self._add_title(ImageDraw.Draw(title_bar), story['title'], title_height, width)
+        
+        slice_height = slice_height or total_height
+        bounds = [(top, min(top + slice_height, total_height))
+                  for top in range(0, total_height, slice_height)]
+        stem = Path(output_path).with_suffix(".png")
+        if len(bounds) == 1:
+            paths = [str(stem)]
+        else:
+            paths = [str(stem.with_name(f"{stem.stem}_{i+1:02d}.png")) for i in range(len(bounds))]
         
-        # Save
-        webtoon.save(output_path, quality=95)
-        print(f"✅ 웹툰 저장 완료: {output_path}")
+        prepared: Dict[int, Image.Image] = {}
+        tiles = 0
+        for path, (start, end) in zip(paths, bounds):
+            with PngStreamWriter(path, width, end - start) as png:
+                for tile_top in range(start, end, tile_height):
+                    tile_bottom = min(tile_top + tile_height, end)
+                    png.write(self._render_strip_tile(
+                        story, plan, prepared, title_bar, width, tile_top, tile_bottom
+                    ))
+                    tiles += 1
         
-        return output_path
+        print(f"✅ 세로 스트립 저장 완료: {width}x{total_height}px, "
+              f"{len(paths)}개 파일, 타일 {tiles}개")
+        return {"paths": paths, "width": width, "height": total_height, "tiles": tiles}
     
-    def _draw_placeholder(self, draw: ImageDraw, pos: Tuple[int, int], 
-                         panel_num: int):
-        """Draw placeholder for missing panel"""
-        x, y = pos
-        colors = ['#FFE5E5', '#E5F0FF', '#E5FFE5', '#FFF4E5']
-        bg_color = colors[(panel_num - 1) % 4]
-        
-        draw.rectangle([x+10, y+10, x+self.panel_width-10, y+self.panel_height-10], 
-                      fill=bg_color)
-        
-        try:
-            # Try multiple fonts for cross-platform compatibility
-            fonts_to_try = [
-                "malgun.ttf", 
-                "arial.ttf", 
-                "/usr/share/fonts/truetype/nanum/NanumBarunGothic.ttf",
-                "/usr/share/fonts/truetype/nanum/NanumGothic.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 
-                "DejaVuSans.ttf"
-            ]
-            font = None
-            for font_name in fonts_to_try:
+    def _render_strip_tile(self, story: Dict, plan: List, prepared: Dict[int, Image.Image],
+                           title_bar: Image.Image, width: int, top: int,
+                           bottom: int) -> Image.Image:
+        """Render strip rows [top, bottom); prepared panels are dropped once passed"""
+        tile = Image.new('RGB', (width, bottom - top), color='white')
+        draw = ImageDraw.Draw(tile)
+        
+        if top < title_bar.height:
+            tile.paste(title_bar, (0, -top))
+        
+        for i, (panel_top, panel_height, img_path) in enumerate(plan):
+            panel_bottom = panel_top + panel_height
+            if panel_bottom <= top:
+                prepared.pop(i, None)
+                continue
+            if panel_top >= bottom:
+                break
+            
+            cell = (0, panel_top - top, width, panel_height)
+            if i not in prepared and img_path is not None:
                 try:
-                    font = ImageFont.truetype(font_name, 80)
-                    break
-                except:
-                    continue
-            if not font:
-                font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
-        
-        draw.text((x + 30, y + 30), f"{panel_num}", fill='#666666', font=font)
-    
-    def _add_title(self, draw: ImageDraw, title: str):
-        """Add title at the top"""
-        try:
-            fonts_to_try = ["malgun.ttf", "arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVuSans.ttf"]
-            font = None
-            for font_name in fonts_to_try:
+                    prepared[i] = prepare_panel(img_path, (width, panel_height), mode=self.fit_mode)
+                except Exception as e:
+                    print(f"  ❌ [{i+1}컷] 배치 실패: {e}")
+                    prepared[i] = None
+            if prepared.get(i) is not None:
+                tile.paste(prepared[i], (0, panel_top - top))
+            else:
+                self._draw_placeholder(draw, cell, i+1)
+            
+            if i < len(story['panels']):
+                panel = story['panels'][i]
+                self._add_speech_bubble(draw, panel['dialogue'], cell,
+                                        panel.get('emotion', '중립'))
+        
+        return tile
+    
+    def _save(self, webtoon: Image.Image, output_path: str) -> str:
+        """Encode and save, returning the written path"""
+        saved = self.encoder.save(webtoon, output_path)
+        quality = f", 품질 {saved['quality']}" if saved["quality"] is not None else ""
+        print(f"✅ 웹툰 저장 완료: {saved['path']} "
+              f"({saved['bytes'] / 1024:.0f}KB{quality}, {saved['encode_time']:.2f}초)")
+        if not saved["fits_budget"]:
+            print(f"  ⚠️ 목표 크기 {self.encoder.max_bytes / 1024:.0f}KB 초과")
+        
+        return saved["path"]
+    
+    def compose_many(self, jobs: List[Dict],
+                     max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        Compose many webtoons in parallel worker processes
+        
+        Each job is a dict with "panel_images" (file paths), "story",
+        "output_path" and an optional "layout". Only these paths and the
+        small story dicts cross the process boundary; every worker loads
+        the panels itself and writes its own output file.
+        
+        Args:
+            jobs: Composition jobs
+            max_workers: Worker processes (default: CPU count)
+        
+        Returns:
+            One result per job, in job order:
+            {"output_path": ..., "success": bool, "error": str or None}
+        """
+        if not jobs:
+            return []
+        
+        max_workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+        settings = (self.width, self.height, self.fit_mode, self.layout,
+                    self.encoder.fmt, self.encoder.quality, self.encoder.max_bytes,
+                    self.encoder.min_quality)
+        
+        if max_workers == 1:
+            _init_worker(*settings)
+            return [_compose_job(job) for job in jobs]
+        
+        print(f"🎨 {len(jobs)}개 웹툰 합성 시작 (프로세스 {max_workers}개)")
+        results: List[Optional[Dict]] = [None] * len(jobs)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=settings) as executor:
+            futures = {executor.submit(_compose_job, job): i
+                       for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
                 try:
-                    font = ImageFont.truetype(font_name, 50)
-                    break
-                except:
-                    continue
-            if not font:
-                font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
+                    results[i] = future.result()
+                except Exception as e:
+                    # Worker process died (e.g. out of memory)
+                    results[i] = {"output_path": jobs[i].get("output_path"),
+                                  "success": False, "error": str(e)}
+        
+        succeeded = sum(1 for r in results if r["success"])
+        print(f"✅ 합성 완료: {succeeded}/{len(jobs)}개 성공")
+        return results
+    
+    def _draw_placeholder(self, draw: ImageDraw, cell: Cell, panel_num: int):
+        """Draw placeholder for missing panel"""
+        x, y, w, h = cell
+        bg_color = self.PLACEHOLDER_COLORS[(panel_num - 1) % len(self.PLACEHOLDER_COLORS)]
         
-        # Title background
-        draw.rectangle([0, 0, self.width, 80], fill='#333333')
+        draw.rectangle([x, y, x + w - 1, y + h - 1], fill=bg_color)
         
-        # Center title
-        bbox = draw.textbbox((0, 0), title, font=font)
-        text_width = bbox[2] - bbox[0]
-        title_x = (self.width - text_width) // 2
+        font = self.fonts.get(80)
         
-        draw.text((title_x, 15), title, fill='white', font=font)
+        draw.text((x + 20, y + 20), f"{panel_num}", fill='#666666', font=font)
     
-    def _add_speech_bubble(self, draw: ImageDraw, dialogue: str, 
-                          pos: Tuple[int, int], emotion: str):
-        """Add speech bubble to panel"""
-        try:
-            fonts_to_try = ["malgun.ttf", "arial.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "DejaVuSans.ttf"]
-            font = None
-            for font_name in fonts_to_try:
-                try:
-                    font = ImageFont.truetype(font_name, 35)
-                    break
-                except:
-                    continue
-            if not font:
-                font = ImageFont.load_default()
-        except:
-            font = ImageFont.load_default()
+    def _add_title(self, draw: ImageDraw, title: str, bar_height: int,
+                   width: Optional[int] = None):
+        """Add title text on the title bar"""
+        width = width or self.width
+        block = self.text.fit(title, max_width=width - 40, max_height=bar_height - 20,
+                              max_size=50, min_size=24, line_spacing=1.0)
         
-        # Bubble position (bottom of panel)
-        x, y = pos
-        bubble_x = x + 50
-        bubble_y = y + self.panel_height - 150
+        # Center each line; center the block vertically in the bar
+        y = (bar_height - block["height"]) // 2
+        for line in block["lines"]:
+            line_width = self.text.text_width(line, block["size"])
+            draw.text(((width - line_width) // 2, y), line,
+                      fill='white', font=block["font"])
+            y += block["line_height"]
+    
+    def _add_speech_bubble(self, draw: ImageDraw, dialogue: str, 
+                          cell: Cell, emotion: str):
+        """Add speech bubble at the bottom of a panel"""
+        x, y, w, h = cell
+        padding = 20
+        margin = 45
         
-        # Text size
-        bbox = draw.textbbox((0, 0), dialogue, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
+        # Wrap the dialogue to the panel width, shrinking the font if the
+        # bubble would cover more than 40% of the panel
+        block = self.text.fit(dialogue, max_width=w - margin * 2 - padding * 2,
+                              max_height=h * 0.4 - padding * 2, max_size=35, min_size=18)
         
         # Bubble size
-        padding = 20
-        bubble_width = min(text_width + padding * 2, self.panel_width - 100)
-        bubble_height = text_height + padding * 2
-        
-        # Emotion colors
-        emotion_colors = {
-            "행복": "#FFE5E5",
-            "놀람": "#FFF4E5",
-            "화남": "#FFE5E5",
-            "슬픔": "#E5F0FF",
-            "당황": "#FFF4E5",
-            "의아함": "#F0F0F0",
-            "중립": "#FFFFFF"
-        }
-        
-        bubble_color = emotion_colors.get(emotion, "#FFFFFF")
+        bubble_width = block["width"] + padding * 2
+        bubble_height = block["height"] + padding * 2
+        
+        # Bubble position (bottom of panel)
+        bubble_x = x + margin
+        bubble_y = y + h - bubble_height - margin
+        
+        bubble_color = self.EMOTION_COLORS.get(emotion, "#FFFFFF")
         
         # Draw bubble
         bubble_coords = [bubble_x, bubble_y, 
@@ -199,8 +547,50 @@ class ImageComposer:
                              fill=bubble_color, outline='black', width=3)
         
         # Draw text
-        draw.text((bubble_x + padding, bubble_y + padding), 
-                 dialogue, fill='black', font=font)
+        text_y = bubble_y + padding
+        for line in block["lines"]:
+            draw.text((bubble_x + padding, text_y), line, fill='black', font=block["font"])
+            text_y += block["line_height"]
+
+
+def _apply_variant(story: Dict, variant: Dict) -> Dict:
+    """Story with a variant's title/dialogue overrides applied"""
+    dialogues = variant.get("dialogues") or []
+    panels = [
+        {**panel, "dialogue": dialogues[i]} if i < len(dialogues) and dialogues[i] is not None
+        else panel
+        for i, panel in enumerate(story['panels'])
+    ]
+    return {**story, "title": variant.get("title", story['title']), "panels": panels}
+
+
+def _same_aspect(a, b, tolerance: float = 0.01) -> bool:
+    return abs(a[0] / a[1] - b[0] / b[1]) <= tolerance * (b[0] / b[1])
+
+
+# Per-process composer used by compose_many workers
+_worker_composer: Optional[ImageComposer] = None
+
+
+def _init_worker(width: int, height: int, fit_mode: str, layout: str,
+                 fmt: str, quality: int, max_bytes: Optional[int], min_quality: int):
+    global _worker_composer
+    encoder = ImageEncoder(fmt, quality=quality, max_bytes=max_bytes,
+                           min_quality=min_quality)
+    _worker_composer = ImageComposer(width=width, height=height, fit_mode=fit_mode,
+                                     layout=layout, encoder=encoder)
+
+
+def _compose_job(job: Dict) -> Dict:
+    try:
+        path = _worker_composer.create_layout(
+            job["panel_images"], job["story"], job["output_path"],
+            layout=job.get("layout")
+        )
+        return {"output_path": path, "success": True, "error": None}
+    except Exception as e:
+        return {"output_path": job.get("output_path"), "success": False,
+                "error": f"{type(e).__name__}: {e}"}
 
 
 if __name__ == "__main__":
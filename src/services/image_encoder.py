@@ -0,0 +1,139 @@
+"""
+Output encoder - format selection and size-budgeted quality search
+"""
+import io
+import os
+import time
+from pathlib import Path
+from PIL import Image
+from typing import Dict, Optional, Tuple
+
+# Format -> (Pillow format name, file extension)
+FORMATS = {
+    "png": ("PNG", ".png"),
+    "jpeg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+}
+
+# Formats with a quality knob (PNG is lossless)
+LOSSY_FORMATS = ("jpeg", "webp")
+
+
+class ImageEncoder:
+    """
+    Encode composed webtoons as optimized PNG, progressive JPEG or WebP
+
+    With a byte budget (max_bytes), lossy formats binary-search the highest
+    quality between min_quality and quality whose output fits. Each encode
+    runs in memory; only the chosen bytes are written to disk.
+    """
+
+    def __init__(self, fmt: str = "png", quality: int = 90,
+                 max_bytes: Optional[int] = None, min_quality: int = 40):
+        """
+        Initialize encoder
+
+        Args:
+            fmt: "png", "jpeg" or "webp"
+            quality: Quality to use (upper bound of the search with max_bytes)
+            max_bytes: Target output size in bytes (None: no budget)
+            min_quality: Lowest quality the search may pick
+        """
+        fmt = fmt.lower()
+        if fmt == "jpg":
+            fmt = "jpeg"
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown output format: {fmt} (expected one of {tuple(FORMATS)})")
+
+        self.fmt = fmt
+        self.quality = quality
+        self.max_bytes = max_bytes or None
+        self.min_quality = min(min_quality, quality)
+
+    @property
+    def extension(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def output_path(self, path: str) -> str:
+        """Path with the extension of this encoder's format"""
+        return str(Path(path).with_suffix(self.extension))
+
+    def encode(self, img: Image.Image) -> Tuple[bytes, Dict]:
+        """
+        Encode an image in memory
+
+        Returns:
+            (encoded bytes, info dict with format, quality, bytes,
+            fits_budget, attempts and encode_time in seconds)
+        """
+        start = time.perf_counter()
+
+        if self.fmt in LOSSY_FORMATS and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        if self.fmt not in LOSSY_FORMATS:
+            data = self._encode(img, None)
+            quality, attempts = None, 1
+        else:
+            data = self._encode(img, self.quality)
+            quality, attempts = self.quality, 1
+
+            if self.max_bytes and len(data) > self.max_bytes:
+                # Highest quality in [min_quality, quality) that fits; size
+                # grows with quality, so a binary search finds it in log2 steps.
+                # If nothing fits, the smallest (lowest quality) output is kept.
+                best, smallest = None, (data, quality)
+                lo, hi = self.min_quality, self.quality - 1
+                while lo <= hi:
+                    mid = (lo + hi) // 2
+                    candidate = self._encode(img, mid)
+                    attempts += 1
+                    if len(candidate) <= self.max_bytes:
+                        best = (candidate, mid)
+                        lo = mid + 1
+                    else:
+                        smallest = min(smallest, (candidate, mid), key=lambda c: c[1])
+                        hi = mid - 1
+
+                data, quality = best or smallest
+
+        info = {
+            "format": self.fmt,
+            "quality": quality,
+            "bytes": len(data),
+            "fits_budget": self.max_bytes is None or len(data) <= self.max_bytes,
+            "attempts": attempts,
+            "encode_time": time.perf_counter() - start
+        }
+        return data, info
+
+    def save(self, img: Image.Image, path: str) -> Dict:
+        """
+        Encode and write an image
+
+        The extension of `path` is replaced by the format's extension.
+
+        Returns:
+            encode() info plus "path"
+        """
+        data, info = self.encode(img)
+
+        path = self.output_path(path)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        info["path"] = path
+        return info
+
+    def _encode(self, img: Image.Image, quality: Optional[int]) -> bytes:
+        buffer = io.BytesIO()
+        pil_format = FORMATS[self.fmt][0]
+        if self.fmt == "png":
+            img.save(buffer, pil_format, optimize=True)
+        elif self.fmt == "jpeg":
+            img.save(buffer, pil_format, quality=quality, optimize=True, progressive=True)
+        else:
+            img.save(buffer, pil_format, quality=quality, method=4)
+        return buffer.getvalue()
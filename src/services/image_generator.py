@@ -2,9 +2,12 @@
 Image generation service using Replicate and Fal.ai APIs
 """
 import sys
-import requests
-from typing import Optional
-import time
+import hashlib
+from typing import Dict, Optional
+
+from .image_cache import ImageCache
+from .downloader import Downloader, get_shared_downloader
+from .image_providers import ImageProvider, get_provider
 
 # UTF-8 encoding
 sys.stdout.reconfigure(encoding='utf-8')
@@ -12,16 +15,27 @@ sys.stdout.reconfigure(encoding='utf-8')
 class ImageGenerator:
     """Generate images using AI APIs"""
     
-    def __init__(self, provider: str = "replicate", api_token: str = None):
+    def __init__(self, provider: str = "replicate", api_token: str = None,
+                 max_concurrency: Optional[int] = None,
+                 cache: Optional[ImageCache] = None,
+                 downloader: Optional[Downloader] = None):
         """
         Initialize image generator
         
         Args:
-            provider: "replicate" or "fal"
+            provider: Registered provider name ("replicate", "fal", ...)
             api_token: API token for the provider
+            max_concurrency: Max in-flight requests to the provider (process-wide,
+                the first generator created for a provider sets the limit;
+                defaults to the provider's declared limit)
+            cache: Optional on-disk cache used by generate_bytes
+            downloader: Downloader to use (default: the shared pooled one)
         """
         self.provider = provider
         self.api_token = api_token
+        self.cache = cache
+        self.downloader = downloader or get_shared_downloader()
+        self.adapter: ImageProvider = get_provider(provider, api_token, max_concurrency)
     
     def generate(self, prompt: str, width: int = 1024, height: int = 1024) -> str:
         """
@@ -35,77 +49,71 @@ class ImageGenerator:
         Returns:
             URL of the generated image
         """
-        if self.provider == "replicate":
-            return self._generate_replicate(prompt, width, height)
-        elif self.provider == "fal":
-            return self._generate_fal(prompt, width, height)
-        else:
-            raise ValueError(f"Unknown provider: {self.provider}")
+        return self.adapter.generate(prompt, width, height)
     
-    def _generate_replicate(self, prompt: str, width: int, height: int) -> str:
-        """Generate image using Replicate API"""
+    def generate_bytes(self, prompt: str, width: int = 1024, height: int = 1024,
+                       use_cache: bool = True) -> Dict:
+        """
+        Generate an image and keep it in memory, serving repeats from the cache
+        
+        Args:
+            prompt: Text prompt for image generation
+            width: Image width
+            height: Image height
+            use_cache: False bypasses the cache lookup (the fresh result
+                still replaces the cached entry)
+        
+        Returns:
+            Dict with data (encoded image bytes), sha256 and from_cache
+        """
+        key = None
+        if self.cache is not None:
+            key = ImageCache.make_key(self.provider, self.adapter.model,
+                                      prompt, width, height)
+            data = self.cache.get_bytes(key) if use_cache else None
+            if data is not None:
+                print(f"⚡ 캐시된 이미지 사용 ({len(data):,} bytes)")
+                return {"data": data, "sha256": hashlib.sha256(data).hexdigest(),
+                        "from_cache": True}
+        
+        image_url = self.generate(prompt, width=width, height=height)
         try:
-            import replicate
-            
-            print(f"🎨 Replicate API로 이미지 생성 중...")
-            print(f"   프롬프트: {prompt[:100]}...")
-            
-            client = replicate.Client(api_token=self.api_token)
-            
-            # Stable Diffusion 3.5
-            output = client.run(
-                "stability-ai/stable-diffusion-3.5-large",
-                input={
-                    "prompt": prompt,
-                    "width": width,
-                    "height": height,
-                    "num_outputs": 1,
-                    "output_format": "png",
-                    "output_quality": 90
-                }
-            )
-            
-            # Output is a list of URLs
-            image_url = output[0] if isinstance(output, list) else output
-            
-            print(f"✅ 이미지 생성 완료: {image_url}")
-            return image_url
-            
+            print(f"📥 이미지 다운로드 중: {image_url}")
+            result = self.downloader.fetch_bytes(image_url)
+            print(f"✅ 이미지 수신 완료 ({result['bytes']:,} bytes, "
+                  f"sha256 {result['sha256'][:12]})")
         except Exception as e:
-            print(f"❌ Replicate 이미지 생성 실패: {e}")
+            print(f"❌ 이미지 다운로드 실패: {e}")
             raise
+        
+        if key is not None:
+            self.cache.put_bytes(key, result["data"], provider=self.provider,
+                                 model=self.adapter.model, sha256=result["sha256"])
+        
+        return {"data": result["data"], "sha256": result["sha256"], "from_cache": False}
     
-    def _generate_fal(self, prompt: str, width: int, height: int) -> str:
-        """Generate image using Fal.ai API"""
+    def fetch_image(self, url: str, save_path: str) -> Dict:
+        """
+        Download image from URL, streaming to disk
+        
+        Args:
+            url: Image URL
+            save_path: Path to save the image
+        
+        Returns:
+            Dict with path, sha256, bytes and attempts
+        """
         try:
-            import fal_client
-            
-            print(f"🎨 Fal.ai API로 이미지 생성 중...")
-            print(f"   프롬프트: {prompt[:100]}...")
-            
-            # Flux Pro
-            result = fal_client.subscribe(
-                "fal-ai/flux-pro",
-                arguments={
-                    "prompt": prompt,
-                    "image_size": {
-                        "width": width,
-                        "height": height
-                    },
-                    "num_inference_steps": 28,
-                    "guidance_scale": 3.5,
-                    "num_images": 1
-                },
-                with_logs=False
-            )
+            print(f"📥 이미지 다운로드 중: {url}")
             
-            image_url = result["images"][0]["url"]
+            result = self.downloader.download(url, save_path)
             
-            print(f"✅ 이미지 생성 완료: {image_url}")
-            return image_url
+            print(f"✅ 이미지 저장 완료: {save_path} "
+                  f"({result['bytes']:,} bytes, sha256 {result['sha256'][:12]})")
+            return result
             
         except Exception as e:
-            print(f"❌ Fal.ai 이미지 생성 실패: {e}")
+            print(f"❌ 이미지 다운로드 실패: {e}")
             raise
     
     def download_image(self, url: str, save_path: str) -> str:
@@ -119,21 +127,7 @@ class ImageGenerator:
         Returns:
             Path to the saved image
         """
-        try:
-            print(f"📥 이미지 다운로드 중: {url}")
-            
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            with open(save_path, 'wb') as f:
-                f.write(response.content)
-            
-            print(f"✅ 이미지 저장 완료: {save_path}")
-            return save_path
-            
-        except Exception as e:
-            print(f"❌ 이미지 다운로드 실패: {e}")
-            raise
+        return self.fetch_image(url, save_path)["path"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+"""
+Image generation provider adapters and registry
+"""
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple, Type
+
+# UTF-8 encoding
+sys.stdout.reconfigure(encoding='utf-8')
+
+class ImageProvider:
+    """
+    Base class for image generation backends
+
+    Subclasses declare their model, default arguments and concurrency
+    limit, implement _create_client and _run, and are added with
+    @register_provider. One instance per (provider, token) is created per
+    process, so the client and its connection pool are set up once.
+    """
+
+    name: str = ""
+    model: str = ""
+    default_args: Dict[str, Any] = {}
+    max_concurrency: int = 4
+
+    def __init__(self, api_token: Optional[str] = None,
+                 max_concurrency: Optional[int] = None):
+        """
+        Initialize provider
+
+        Args:
+            api_token: API token for the provider
+            max_concurrency: Override for the class's in-flight request limit
+        """
+        self.api_token = api_token
+        self.max_concurrency = max(1, max_concurrency or self.max_concurrency)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Provider client, created on first use and reused afterwards"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+
+    def generate(self, prompt: str, width: int, height: int) -> str:
+        """
+        Generate an image, waiting while max_concurrency requests are in flight
+
+        Returns:
+            URL of the generated image
+        """
+        with self._slots:
+            return self._run(prompt, width, height)
+
+    def _create_client(self):
+        raise NotImplementedError
+
+    def _run(self, prompt: str, width: int, height: int) -> str:
+        raise NotImplementedError
+
+
+PROVIDERS: Dict[str, Type[ImageProvider]] = {}
+
+_instances: Dict[Tuple[str, Optional[str]], ImageProvider] = {}
+_instances_lock = threading.Lock()
+
+
+def register_provider(cls: Type[ImageProvider]) -> Type[ImageProvider]:
+    """Class decorator adding a provider to the registry under cls.name"""
+    PROVIDERS[cls.name] = cls
+    return cls
+
+
+def get_provider(name: str, api_token: Optional[str] = None,
+                 max_concurrency: Optional[int] = None) -> ImageProvider:
+    """
+    Get the shared provider instance for a name and token
+
+    Args:
+        name: Registered provider name
+        api_token: API token for the provider
+        max_concurrency: In-flight limit (only used when the instance is created)
+
+    Returns:
+        Provider instance
+    """
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown provider: {name}")
+
+    with _instances_lock:
+        key = (name, api_token)
+        if key not in _instances:
+            _instances[key] = PROVIDERS[name](api_token, max_concurrency)
+        return _instances[key]
+
+
+@register_provider
+class ReplicateProvider(ImageProvider):
+    """Stable Diffusion 3.5 on Replicate"""
+
+    name = "replicate"
+    model = "stability-ai/stable-diffusion-3.5-large"
+    default_args = {
+        "num_outputs": 1,
+        "output_format": "png",
+        "output_quality": 90
+    }
+    max_concurrency = 4
+
+    def _create_client(self):
+        import replicate
+        return replicate.Client(api_token=self.api_token)
+
+    def _run(self, prompt: str, width: int, height: int) -> str:
+        try:
+            print(f"🎨 Replicate API로 이미지 생성 중...")
+            print(f"   프롬프트: {prompt[:100]}...")
+
+            output = self.client.run(
+                self.model,
+                input={
+                    **self.default_args,
+                    "prompt": prompt,
+                    "width": width,
+                    "height": height
+                }
+            )
+
+            # Output is a list of URLs
+            image_url = output[0] if isinstance(output, list) else output
+
+            print(f"✅ 이미지 생성 완료: {image_url}")
+            return image_url
+
+        except Exception as e:
+            print(f"❌ Replicate 이미지 생성 실패: {e}")
+            raise
+
+
+@register_provider
+class FalProvider(ImageProvider):
+    """Flux Pro on Fal.ai"""
+
+    name = "fal"
+    model = "fal-ai/flux-pro"
+    default_args = {
+        "num_inference_steps": 28,
+        "guidance_scale": 3.5,
+        "num_images": 1
+    }
+    max_concurrency = 4
+
+    def _create_client(self):
+        import fal_client
+        # Falls back to the FAL_KEY environment variable when no token is given
+        return fal_client.SyncClient(key=self.api_token)
+
+    def _run(self, prompt: str, width: int, height: int) -> str:
+        try:
+            print(f"🎨 Fal.ai API로 이미지 생성 중...")
+            print(f"   프롬프트: {prompt[:100]}...")
+
+            result = self.client.subscribe(
+                self.model,
+                arguments={
+                    **self.default_args,
+                    "prompt": prompt,
+                    "image_size": {
+                        "width": width,
+                        "height": height
+                    }
+                },
+                with_logs=False
+            )
+
+            image_url = result["images"][0]["url"]
+
+            print(f"✅ 이미지 생성 완료: {image_url}")
+            return image_url
+
+        except Exception as e:
+            print(f"❌ Fal.ai 이미지 생성 실패: {e}")
+            raise
@@ -0,0 +1,144 @@
+"""
+Webtoon layout engine - named layouts and prerendered static chrome
+"""
+from functools import lru_cache
+from PIL import Image, ImageDraw
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Panel content area: (x, y, width, height)
+Cell = Tuple[int, int, int, int]
+
+
+class Layout:
+    """
+    A named panel arrangement
+
+    Panels are placed in rows of equal height below the title bar; the row
+    spec gives the number of panels in each row (e.g. [2, 2] for a 2x2
+    grid). Cell geometry and the static chrome (background, title bar,
+    panel borders) depend only on the layout, the canvas size and the panel
+    count, so both are computed once and cached.
+    """
+
+    title_height = 80
+    gutter = 10
+    border = 5
+    background = "white"
+    title_color = "#333333"
+    border_color = "black"
+
+    def __init__(self, name: str, rows: Callable[[int], List[int]],
+                 panel_counts: Optional[Tuple[int, ...]] = None):
+        """
+        Initialize layout
+
+        Args:
+            name: Layout name
+            rows: Panel count -> panels per row
+            panel_counts: Supported panel counts (None: any count >= 1)
+        """
+        self.name = name
+        self._rows = rows
+        self.panel_counts = panel_counts
+
+    def supports(self, num_panels: int) -> bool:
+        if num_panels < 1:
+            return False
+        return self.panel_counts is None or num_panels in self.panel_counts
+
+    def cells(self, width: int, height: int, num_panels: int) -> List[Cell]:
+        """Panel content areas, in reading order"""
+        return list(_cells(self.name, width, height, num_panels))
+
+    def chrome(self, width: int, height: int, num_panels: int) -> Image.Image:
+        """
+        Static chrome for this layout (cached and shared; copy before drawing)
+        """
+        return _chrome(self.name, width, height, num_panels)
+
+    def _compute_cells(self, width: int, height: int, num_panels: int) -> List[Cell]:
+        if not self.supports(num_panels):
+            raise ValueError(f"Layout '{self.name}' does not support {num_panels} panels")
+
+        rows = self._rows(num_panels)
+        g, b = self.gutter, self.border
+        top = self.title_height + g
+        row_height = (height - top - g * len(rows)) / len(rows)
+
+        cells = []
+        for r, cols in enumerate(rows):
+            y = top + r * (row_height + g)
+            col_width = (width - g * (cols + 1)) / cols
+            for c in range(cols):
+                x = g + c * (col_width + g)
+                # Content sits inside the border
+                cells.append((round(x) + b, round(y) + b,
+                              round(col_width) - 2 * b, round(row_height) - 2 * b))
+        return cells[:num_panels]
+
+    def _render_chrome(self, width: int, height: int, num_panels: int) -> Image.Image:
+        canvas = Image.new('RGB', (width, height), color=self.background)
+        draw = ImageDraw.Draw(canvas)
+
+        # Title bar
+        draw.rectangle([0, 0, width, self.title_height], fill=self.title_color)
+
+        # Panel borders
+        b = self.border
+        for x, y, w, h in self.cells(width, height, num_panels):
+            draw.rectangle([x - b, y - b, x + w + b - 1, y + h + b - 1],
+                           outline=self.border_color, width=b)
+        return canvas
+
+
+LAYOUTS: Dict[str, Layout] = {}
+
+
+def register_layout(layout: Layout) -> Layout:
+    """Add a layout to the registry under its name"""
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+def get_layout(name: str = "auto", num_panels: int = 4) -> Layout:
+    """
+    Get a layout by name
+
+    Args:
+        name: Registered layout name, or "auto" to pick one for the panel count
+        num_panels: Number of panels to place
+
+    Returns:
+        Layout supporting num_panels
+    """
+    if name == "auto":
+        name = {4: "grid_2x2", 3: "three_panel"}.get(num_panels, "strip")
+
+    if name not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {name} (available: {', '.join(sorted(LAYOUTS))})")
+
+    layout = LAYOUTS[name]
+    if not layout.supports(num_panels):
+        raise ValueError(f"Layout '{name}' does not support {num_panels} panels")
+    return layout
+
+
+@lru_cache(maxsize=64)
+def _cells(name: str, width: int, height: int, num_panels: int) -> Tuple[Cell, ...]:
+    return tuple(LAYOUTS[name]._compute_cells(width, height, num_panels))
+
+
+@lru_cache(maxsize=16)
+def _chrome(name: str, width: int, height: int, num_panels: int) -> Image.Image:
+    return LAYOUTS[name]._render_chrome(width, height, num_panels)
+
+
+def chrome_cache_info():
+    """lru_cache statistics of the chrome cache"""
+    return _chrome.cache_info()
+
+
+register_layout(Layout("grid_2x2", lambda n: [2, 2], panel_counts=(4,)))
+register_layout(Layout("vertical_1x4", lambda n: [1] * 4, panel_counts=(4,)))
+register_layout(Layout("three_panel", lambda n: [1, 2], panel_counts=(3,)))
+register_layout(Layout("strip", lambda n: [1] * n))
@@ -0,0 +1,116 @@
+"""
+Streaming PNG writer - encode an image tile by tile without holding it in memory
+"""
+import os
+import struct
+import zlib
+from PIL import Image, ImageChops
+from typing import Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG "Up" filter: each byte minus the byte above it
+FILTER_UP = b"\x02"
+
+
+class PngStreamWriter:
+    """
+    Write an RGB PNG from horizontal tiles, top to bottom
+
+    Only the current tile and the last row of the previous one are held;
+    rows are Up-filtered (computed in C with ImageChops) and deflated
+    incrementally, so memory use does not grow with the image height.
+    The file is written to "<path>.part" and moved into place on close().
+
+    Usage:
+        with PngStreamWriter(path, 800, 12000) as png:
+            for tile in tiles:
+                png.write(tile)
+    """
+
+    def __init__(self, path: str, width: int, height: int, compress_level: int = 6):
+        """
+        Initialize writer
+
+        Args:
+            path: Output file path
+            width: Image width (every tile must have it)
+            height: Total image height (sum of tile heights)
+            compress_level: zlib level 0-9
+        """
+        self.path = path
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self._part_path = path + ".part"
+        self._file = open(self._part_path, "wb")
+        self._deflate = zlib.compressobj(compress_level)
+        self._prev_row: Optional[Image.Image] = None
+
+        self._file.write(PNG_SIGNATURE)
+        # 8-bit truecolor, no interlace
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write(self, tile: Image.Image):
+        """Append the next tile (RGB, full width)"""
+        if tile.mode != "RGB":
+            tile = tile.convert("RGB")
+        if tile.width != self.width:
+            raise ValueError(f"Tile width {tile.width} != image width {self.width}")
+        if self.rows_written + tile.height > self.height:
+            raise ValueError("Tiles exceed the declared image height")
+
+        # Row above each row: previous tile's last row, then this tile shifted down
+        above = Image.new("RGB", tile.size)
+        if self._prev_row is not None:
+            above.paste(self._prev_row, (0, 0))
+        above.paste(tile.crop((0, 0, tile.width, tile.height - 1)), (0, 1))
+        filtered = ImageChops.subtract_modulo(tile, above).tobytes()
+        self._prev_row = tile.crop((0, tile.height - 1, tile.width, tile.height))
+
+        stride = self.width * 3
+        raw = b"".join(FILTER_UP + filtered[i:i + stride]
+                       for i in range(0, len(filtered), stride))
+        self._idat(self._deflate.compress(raw))
+        self.rows_written += tile.height
+
+    def close(self):
+        """Finish the file (all rows must have been written)"""
+        if self._file is None:
+            return
+        try:
+            if self.rows_written != self.height:
+                raise ValueError(f"Only {self.rows_written}/{self.height} rows written")
+            self._idat(self._deflate.flush())
+            self._chunk(b"IEND", b"")
+            self._file.close()
+            os.replace(self._part_path, self.path)
+        finally:
+            self._abort()
+
+    def _abort(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self._part_path):
+            os.remove(self._part_path)
+
+    def _idat(self, data: bytes):
+        if data:
+            self._chunk(b"IDAT", data)
+
+    def _chunk(self, kind: bytes, data: bytes):
+        self._file.write(struct.pack(">I", len(data)))
+        self._file.write(kind)
+        self._file.write(data)
+        self._file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
+        return False
@@ -3,8 +3,12 @@ Story generation service using Claude API
 """
 import sys
 import json
+import hashlib
+import threading
 import anthropic
-from typing import Dict, List
+from typing import Callable, Dict, Optional, Tuple
+
+from .story_stream import PanelStreamParser
 
 # UTF-8 encoding
 sys.stdout.reconfigure(encoding='utf-8')
@@ -12,11 +16,26 @@ sys.stdout.reconfigure(encoding='utf-8')
 class StoryGenerator:
     """Generate 4-panel webtoon stories using Claude API"""
     
-    def __init__(self, api_key: str):
+    MODEL = "claude-3-5-sonnet-20241022"
+    
+    def __init__(self, api_key: str, db=None, cache_ttl: Optional[float] = None):
+        """
+        Initialize story generator
+        
+        Args:
+            api_key: Anthropic API key
+            db: Database used for the response cache (None disables caching)
+            cache_ttl: Cache entry lifetime in seconds (default: 7 days)
+        """
         self.client = anthropic.Anthropic(api_key=api_key)
+        self.db = db
+        self.cache_ttl = cache_ttl if cache_ttl is not None else 7 * 24 * 3600
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._stats_lock = threading.Lock()
     
     def generate(self, topic: str = "직장인 공감", style: str = "유머", 
-                 num_panels: int = 4) -> Dict:
+                 num_panels: int = 4, force_refresh: bool = False) -> Dict:
         """
         Generate a webtoon story
         
@@ -24,11 +43,140 @@ class StoryGenerator:
             topic: Story topic (e.g., "직장인 공감", "개발자 일상")
             style: Story style (e.g., "유머", "감동", "공포")
             num_panels: Number of panels (default: 4)
+            force_refresh: Skip the response cache and call the API
         
         Returns:
             Dict with title and panels
         """
-        prompt = f"""
+        story, _ = self.generate_with_source(topic, style, num_panels, force_refresh)
+        return story
+    
+    def generate_with_source(self, topic: str = "직장인 공감", style: str = "유머",
+                             num_panels: int = 4,
+                             force_refresh: bool = False) -> Tuple[Dict, bool]:
+        """
+        Generate a webtoon story, reporting whether it came from the cache
+        
+        Args:
+            topic: Story topic
+            style: Story style
+            num_panels: Number of panels
+            force_refresh: Skip the cache lookup (the fresh story replaces the entry)
+        
+        Returns:
+            (story dict, True if served from the response cache)
+        """
+        prompt = self._build_prompt(topic, style, num_panels)
+        cache_key = self._cache_key(prompt, topic, style, num_panels)
+        
+        story = None if force_refresh else self._get_cached(cache_key)
+        if story is not None:
+            return story, True
+        
+        try:
+            story = self._request_story(prompt, topic, style, num_panels)
+        except Exception as e:
+            print(f"❌ 스토리 생성 실패: {e}")
+            print("데모용 샘플 스토리를 사용합니다.")
+            return self._get_sample_story(topic, style, num_panels), False
+        
+        # Only real API responses are cached, never the fallback sample
+        self._put_cached(cache_key, story, topic, style, num_panels)
+        return story, False
+    
+    def generate_stream(self, topic: str = "직장인 공감", style: str = "유머",
+                        num_panels: int = 4,
+                        on_panel: Optional[Callable[[int, Dict], None]] = None,
+                        force_refresh: bool = False) -> Tuple[Dict, bool]:
+        """
+        Generate a story with a streaming request, emitting panels as they arrive
+        
+        on_panel(index, panel) is called as soon as each panel object is
+        complete, so callers can start work on panel 1 while the rest of the
+        story is still being written. On a cache hit every panel is emitted
+        immediately. If the request fails, the fallback sample story is
+        returned without emitting its panels; callers should reconcile
+        against the returned story.
+        
+        Args:
+            topic: Story topic
+            style: Story style
+            num_panels: Number of panels
+            on_panel: Callback receiving (panel index, panel dict)
+            force_refresh: Skip the cache lookup
+        
+        Returns:
+            (story dict, True if served from the response cache)
+        """
+        prompt = self._build_prompt(topic, style, num_panels)
+        cache_key = self._cache_key(prompt, topic, style, num_panels)
+        
+        story = None if force_refresh else self._get_cached(cache_key)
+        if story is not None:
+            if on_panel is not None:
+                for i, panel in enumerate(story["panels"]):
+                    on_panel(i, panel)
+            return story, True
+        
+        try:
+            print(f"🎨 Claude API로 스토리 생성 중 (스트리밍)... (주제: {topic}, 스타일: {style})")
+            
+            parser = PanelStreamParser(on_panel)
+            with self.client.messages.stream(
+                model=self.MODEL,
+                max_tokens=3000,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                for text in stream.text_stream:
+                    parser.feed(text)
+            
+            story = self.parse_story(parser.text, num_panels)
+            print(f"✅ 스토리 생성 완료: {story['title']}")
+        except Exception as e:
+            print(f"❌ 스토리 생성 실패: {e}")
+            print("데모용 샘플 스토리를 사용합니다.")
+            return self._get_sample_story(topic, style, num_panels), False
+        
+        self._put_cached(cache_key, story, topic, style, num_panels)
+        return story, False
+    
+    def _get_cached(self, cache_key: str) -> Optional[Dict]:
+        """Look up a cached story, counting the hit or miss"""
+        cached = None
+        if self.db is not None:
+            cached = self.db.get_cached_story(cache_key, self.cache_ttl)
+        
+        with self._stats_lock:
+            if cached is None:
+                self.cache_misses += 1
+                return None
+            self.cache_hits += 1
+        
+        story = json.loads(cached)
+        print(f"⚡ 캐시된 스토리 사용: {story['title']}")
+        return story
+    
+    def _put_cached(self, cache_key: str, story: Dict, topic: str, style: str,
+                    num_panels: int):
+        """Store an API-generated story in the response cache"""
+        if self.db is None:
+            return
+        self.db.put_cached_story(
+            cache_key, self.MODEL, topic, style, num_panels,
+            json.dumps(story, ensure_ascii=False)
+        )
+    
+    def _cache_key(self, prompt: str, topic: str, style: str, num_panels: int) -> str:
+        """Build the response cache key"""
+        payload = json.dumps([self.MODEL, prompt, topic, style, num_panels],
+                             ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _build_prompt(self, topic: str, style: str, num_panels: int) -> str:
+        """Build the story generation prompt"""
+        return f"""
 당신은 창의적인 웹툰 작가입니다. 다음 조건에 맞는 {num_panels}컷 만화 스토리를 생성해주세요.
 
 **주제**: {topic}
@@ -63,46 +211,57 @@ class StoryGenerator:
 
 반드시 JSON 형식으로만 답변해주세요.
 """
+    
+    def _request_story(self, prompt: str, topic: str, style: str,
+                       num_panels: int) -> Dict:
+        """Call the API and parse/validate the story (raises on failure)"""
+        print(f"🎨 Claude API로 스토리 생성 중... (주제: {topic}, 스타일: {style})")
         
-        try:
-            print(f"🎨 Claude API로 스토리 생성 중... (주제: {topic}, 스타일: {style})")
-            
-            message = self.client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=3000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            response_text = message.content[0].text
-            
-            # JSON 추출
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.find("```", json_start)
-                response_text = response_text[json_start:json_end].strip()
-            
-            story = json.loads(response_text)
-            
-            # Validation
-            if "title" not in story or "panels" not in story:
-                raise ValueError("Invalid story format")
-            
-            if len(story["panels"]) != num_panels:
-                raise ValueError(f"Expected {num_panels} panels, got {len(story['panels'])}")
-            
-            print(f"✅ 스토리 생성 완료: {story['title']}")
-            return story
-            
-        except Exception as e:
-            print(f"❌ 스토리 생성 실패: {e}")
-            print("데모용 샘플 스토리를 사용합니다.")
-            return self._get_sample_story(topic, style, num_panels)
+        message = self.client.messages.create(
+            model=self.MODEL,
+            max_tokens=3000,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+        
+        story = self.parse_story(message.content[0].text, num_panels)
+        
+        print(f"✅ 스토리 생성 완료: {story['title']}")
+        return story
+    
+    @staticmethod
+    def parse_story(response_text: str, num_panels: int) -> Dict:
+        """
+        Extract and validate the story JSON from a model response
+        
+        Args:
+            response_text: Raw response (optionally wrapped in a ``` fence)
+            num_panels: Expected number of panels
+        
+        Returns:
+            Story dict
+        """
+        # JSON 추출
+        if "```json" in response_text:
+            json_start = response_text.find("```json") + 7
+            json_end = response_text.find("```", json_start)
+            response_text = response_text[json_start:json_end].strip()
+        elif "```" in response_text:
+            json_start = response_text.find("```") + 3
+            json_end = response_text.find("```", json_start)
+            response_text = response_text[json_start:json_end].strip()
+        
+        story = json.loads(response_text)
+        
+        # Validation
+        if "title" not in story or "panels" not in story:
+            raise ValueError("Invalid story format")
+        
+        if len(story["panels"]) != num_panels:
+            raise ValueError(f"Expected {num_panels} panels, got {len(story['panels'])}")
+        
+        return story
     
     def _get_sample_story(self, topic: str, style: str, num_panels: int) -> Dict:
         """Fallback sample story"""
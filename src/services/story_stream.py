@@ -0,0 +1,92 @@
+"""
+Incremental parser that emits story panels while the response streams in
+"""
+import json
+from typing import Callable, Dict, List, Optional
+
+
+class PanelStreamParser:
+    """
+    Scan streamed story JSON and emit each panel object as soon as it closes
+
+    Feed text chunks with feed(); on_panel(index, panel) is called for each
+    complete object inside the top-level "panels" array. Text before the
+    first "{" (such as a ```json fence) is ignored. The parser only tracks
+    nesting and string state, so each character is looked at once.
+    """
+
+    def __init__(self, on_panel: Optional[Callable[[int, Dict], None]] = None):
+        self.on_panel = on_panel
+        self.panels: List[Dict] = []
+        self._buffer: List[str] = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._panels_depth: Optional[int] = None
+        self._panel_start: Optional[int] = None
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: str):
+        """Consume the next piece of response text"""
+        for ch in chunk:
+            self._buffer.append(ch)
+            self._consume(ch)
+            self._pos += 1
+
+    def _consume(self, ch: str):
+        if self._done:
+            return
+
+        if not self._started:
+            if ch != "{":
+                return
+            self._started = True
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    # Strings directly in the top-level object: keys and scalar values
+                    self._last_key = "".join(self._buffer[self._string_start + 1:self._pos])
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._string_start = self._pos
+        elif ch in "{[":
+            self._depth += 1
+            if ch == "[" and self._depth == 2 and self._last_key == "panels":
+                self._panels_depth = self._depth
+            elif ch == "{" and self._panels_depth is not None \
+                    and self._depth == self._panels_depth + 1:
+                self._panel_start = self._pos
+        elif ch in "}]":
+            if ch == "}" and self._panel_start is not None \
+                    and self._depth == self._panels_depth + 1:
+                self._emit("".join(self._buffer[self._panel_start:self._pos + 1]))
+                self._panel_start = None
+            elif ch == "]" and self._depth == self._panels_depth:
+                self._panels_depth = None
+            self._depth -= 1
+            if self._depth == 0:
+                self._done = True
+
+    def _emit(self, text: str):
+        panel = json.loads(text)
+        index = len(self.panels)
+        self.panels.append(panel)
+        if self.on_panel is not None:
+            self.on_panel(index, panel)
+
+    @property
+    def text(self) -> str:
+        """All text fed so far"""
+        return "".join(self._buffer)
@@ -0,0 +1,194 @@
+"""
+Text layout - cached glyph advances, Hangul-aware wrapping and fit-to-box sizing
+"""
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .fonts import FontRegistry, get_font_registry
+
+# Kept at the end of a line instead of starting the next one
+NO_LINE_START = set(".,!?)]}~…·:;’”」』>%")
+
+
+class TextLayout:
+    """
+    Measure, wrap and size text without repeated textbbox calls
+
+    Glyph advance widths are measured once per (family, size, character)
+    and line widths are sums of cached advances. Lines break at spaces
+    (Korean word units); a word wider than the box is split between
+    characters, which is fine for Hangul syllables. Finished layouts are
+    memoized, so re-rendering the same dialogue (variants, retries) is a
+    dict lookup.
+    """
+
+    def __init__(self, fonts: Optional[FontRegistry] = None, max_layouts: int = 1024):
+        """
+        Initialize text layout
+
+        Args:
+            fonts: Font registry (default: the shared process-wide one)
+            max_layouts: Finished layouts kept in the memo
+        """
+        self.fonts = fonts or get_font_registry()
+        self.max_layouts = max_layouts
+        self._advances: Dict[Tuple[str, int], Dict[str, float]] = {}
+        self._line_heights: Dict[Tuple[str, int], int] = {}
+        self._layouts: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def text_width(self, text: str, size: int, family: str = "sans") -> float:
+        """Width of a single line, from cached advances"""
+        advances = self._advance_table(size, family)
+        font = None
+        width = 0.0
+        for ch in text:
+            advance = advances.get(ch)
+            if advance is None:
+                font = font or self.fonts.get(size, family)
+                advance = advances[ch] = font.getlength(ch)
+            width += advance
+        return width
+
+    def line_height(self, size: int, family: str = "sans") -> int:
+        """Ascent + descent of the font at this size"""
+        key = (family, size)
+        height = self._line_heights.get(key)
+        if height is None:
+            font = self.fonts.get(size, family)
+            try:
+                ascent, descent = font.getmetrics()
+                height = ascent + descent
+            except AttributeError:
+                # Bitmap default font
+                bbox = font.getbbox("가Ag")
+                height = bbox[3] - bbox[1]
+            self._line_heights[key] = height
+        return height
+
+    def wrap(self, text: str, max_width: float, size: int,
+             family: str = "sans") -> List[str]:
+        """
+        Break text into lines no wider than max_width
+
+        Explicit newlines are kept. Words longer than a line are split
+        between characters; closing punctuation stays on the line before.
+        """
+        space = self.text_width(" ", size, family)
+        lines: List[str] = []
+
+        for paragraph in text.split("\n"):
+            line, line_width = "", 0.0
+            for word in paragraph.split():
+                word_width = self.text_width(word, size, family)
+                if line and line_width + space + word_width <= max_width:
+                    line, line_width = f"{line} {word}", line_width + space + word_width
+                    continue
+
+                if line:
+                    lines.append(line)
+                if word_width <= max_width:
+                    line, line_width = word, word_width
+                    continue
+
+                # Split an overlong word between characters
+                line, line_width = "", 0.0
+                for ch in word:
+                    ch_width = self.text_width(ch, size, family)
+                    if line and line_width + ch_width > max_width and ch not in NO_LINE_START:
+                        lines.append(line)
+                        line, line_width = "", 0.0
+                    line, line_width = line + ch, line_width + ch_width
+            lines.append(line)
+
+        return lines
+
+    def fit(self, text: str, max_width: float, max_height: float, max_size: int,
+            min_size: int = 16, family: str = "sans", line_spacing: float = 1.2,
+            max_lines: Optional[int] = None) -> Dict:
+        """
+        Wrap text at the largest font size (max_size down to min_size) that fits a box
+
+        Args:
+            text: Text to lay out
+            max_width: Box width in pixels
+            max_height: Box height in pixels
+            max_size: Preferred font size
+            min_size: Smallest font size to try
+            family: Font family name
+            line_spacing: Line advance as a multiple of the line height
+            max_lines: Upper limit on the number of lines
+
+        Returns:
+            {"lines", "font", "size", "line_height" (advance between lines),
+            "width", "height", "fits"}; with fits False the min_size layout
+            is returned
+        """
+        key = (text, round(max_width), round(max_height), max_size, min_size,
+               family, line_spacing, max_lines)
+        with self._lock:
+            cached = self._layouts.get(key)
+            if cached is not None:
+                self._layouts.move_to_end(key)
+                return cached
+
+        block = None
+        for size in range(max_size, min_size - 1, -1):
+            block = self._layout(text, max_width, size, family, line_spacing)
+            if block["width"] <= max_width and block["height"] <= max_height and \
+                    (max_lines is None or len(block["lines"]) <= max_lines):
+                block["fits"] = True
+                break
+        else:
+            block["fits"] = False
+
+        with self._lock:
+            self._layouts[key] = block
+            if len(self._layouts) > self.max_layouts:
+                self._layouts.popitem(last=False)
+        return block
+
+    def stats(self) -> Dict:
+        """Cache sizes"""
+        with self._lock:
+            return {
+                "glyph_tables": len(self._advances),
+                "glyphs": sum(len(t) for t in self._advances.values()),
+                "layouts": len(self._layouts)
+            }
+
+    def _layout(self, text: str, max_width: float, size: int, family: str,
+                line_spacing: float) -> Dict:
+        lines = self.wrap(text, max_width, size, family)
+        font_height = self.line_height(size, family)
+        advance = round(font_height * line_spacing)
+        return {
+            "lines": lines,
+            "font": self.fonts.get(size, family),
+            "size": size,
+            "line_height": advance,
+            "width": max((self.text_width(l, size, family) for l in lines), default=0),
+            "height": advance * (len(lines) - 1) + font_height
+        }
+
+    def _advance_table(self, size: int, family: str) -> Dict[str, float]:
+        key = (family, size)
+        table = self._advances.get(key)
+        if table is None:
+            with self._lock:
+                table = self._advances.setdefault(key, {})
+        return table
+
+
+_default_layout: Optional[TextLayout] = None
+_default_lock = threading.Lock()
+
+
+def get_text_layout() -> TextLayout:
+    """Get the process-wide text layout"""
+    global _default_layout
+    with _default_lock:
+        if _default_layout is None:
+            _default_layout = TextLayout()
+        return _default_layout